@@ -30,6 +30,12 @@ class Interpreter(InterpreterBase):
     # usese the provided Parser found in brewparse.py to parse the program
     # into an abstract syntax tree (ast)
     def run(self, program):
+        try:
+            self.__run(program)
+        finally:
+            self.flush_output()  # write out what an output sink still holds, even after an error
+
+    def __run(self, program):
         ast = parse_program(program)
         self.__set_up_function_table(ast)
         self.env = EnvironmentManager()
@@ -0,0 +1,270 @@
+from intbase import InterpreterBase
+
+# The AST node classes brewparse builds, one per kind of node, with their fields in __slots__
+# rather than in the per-node dict of element.Element.  Fields are plain attributes (node.op1,
+# node.statements, ...) and have the same names as the Element keys; get() is kept so code
+# written against Element works unchanged.  Besides its FIELDS, a class has slots for the
+# annotations the static passes add (addr, free, param_slots, pure, first, strict), which stay
+# unset until a pass sets them.  Every node has a line slot, which
+# brewparse sets on statements to the line they were parsed from (brewbin keeps it).
+
+
+class Node:
+    __slots__ = ("line",)
+    FIELDS = ()
+
+    # the Element interface; None for a missing key, as before
+    def get(self, key):
+        return getattr(self, key, None)
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.FIELDS]
+
+    # same format as Element, which the interpreters' trace output uses
+    def __str__(self):
+        s = f"{self.elem_type}: "
+        for key, value in self.items():
+            s += key + ": " + Node.__val(value) + ", "
+        return s[0:-2]
+
+    @staticmethod
+    def __val(v):
+        if isinstance(v, Node):
+            return "[" + str(v) + "]"
+        if isinstance(v, list):
+            s = ""
+            for i in v:
+                s += str(i) + ", "
+            if len(s) > 0:
+                return "[" + s[0:-2] + "]"
+            return "[" + s + "]"
+        return str(v)
+
+
+class Program(Node):
+    __slots__ = ("structs", "functions")
+    FIELDS = __slots__
+    elem_type = InterpreterBase.PROGRAM_NODE
+
+    def __init__(self, structs, functions):
+        self.structs = structs
+        self.functions = functions
+
+
+class Struct(Node):
+    __slots__ = ("name", "fields")
+    FIELDS = __slots__
+    elem_type = InterpreterBase.STRUCT_NODE
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+
+class FieldDef(Node):
+    __slots__ = ("name", "var_type")
+    FIELDS = __slots__
+    elem_type = InterpreterBase.FIELD_DEF_NODE
+
+    def __init__(self, name, var_type):
+        self.name = name
+        self.var_type = var_type
+
+
+class Func(Node):
+    __slots__ = ("name", "args", "return_type", "statements", "param_slots")
+    FIELDS = ("name", "args", "return_type", "statements")
+    elem_type = InterpreterBase.FUNC_NODE
+
+    def __init__(self, name, args, return_type, statements):
+        self.name = name
+        self.args = args
+        self.return_type = return_type
+        self.statements = statements
+
+
+class Arg(Node):
+    __slots__ = ("name", "var_type")
+    FIELDS = __slots__
+    elem_type = InterpreterBase.ARG_NODE
+
+    def __init__(self, name, var_type):
+        self.name = name
+        self.var_type = var_type
+
+
+class Assign(Node):
+    __slots__ = ("name", "expression", "addr", "strict")
+    FIELDS = ("name", "expression")
+    elem_type = "="
+
+    def __init__(self, name, expression):
+        self.name = name
+        self.expression = expression
+
+
+class VarDef(Node):
+    __slots__ = ("name", "var_type", "addr")
+    FIELDS = ("name", "var_type")
+    elem_type = InterpreterBase.VAR_DEF_NODE
+
+    def __init__(self, name, var_type):
+        self.name = name
+        self.var_type = var_type
+
+
+class If(Node):
+    __slots__ = ("condition", "statements", "else_statements")
+    FIELDS = __slots__
+    elem_type = InterpreterBase.IF_NODE
+
+    def __init__(self, condition, statements, else_statements):
+        self.condition = condition
+        self.statements = statements
+        self.else_statements = else_statements
+
+
+class Try(Node):
+    __slots__ = ("statements", "catchers")
+    FIELDS = __slots__
+    elem_type = InterpreterBase.TRY_NODE
+
+    def __init__(self, statements, catchers):
+        self.statements = statements
+        self.catchers = catchers
+
+
+class Catch(Node):
+    __slots__ = ("exception_type", "statements")
+    FIELDS = __slots__
+    elem_type = InterpreterBase.CATCH_NODE
+
+    def __init__(self, exception_type, statements):
+        self.exception_type = exception_type
+        self.statements = statements
+
+
+class For(Node):
+    __slots__ = ("init", "condition", "update", "statements")
+    FIELDS = __slots__
+    elem_type = InterpreterBase.FOR_NODE
+
+    def __init__(self, init, condition, update, statements):
+        self.init = init
+        self.condition = condition
+        self.update = update
+        self.statements = statements
+
+
+class Raise(Node):
+    __slots__ = ("exception_type",)
+    FIELDS = __slots__
+    elem_type = InterpreterBase.RAISE_NODE
+
+    def __init__(self, exception_type):
+        self.exception_type = exception_type
+
+
+class Return(Node):
+    __slots__ = ("expression",)
+    FIELDS = __slots__
+    elem_type = InterpreterBase.RETURN_NODE
+
+    def __init__(self, expression):
+        self.expression = expression
+
+
+# neg and !
+class UnaryOp(Node):
+    __slots__ = ("elem_type", "op1", "pure", "first", "free")
+    FIELDS = ("op1",)
+
+    def __init__(self, elem_type, op1):
+        self.elem_type = elem_type
+        self.op1 = op1
+
+
+# arithmetic, comparison and logical operators; elem_type is the operator
+class BinOp(Node):
+    __slots__ = ("elem_type", "op1", "op2", "pure", "first", "free")
+    FIELDS = ("op1", "op2")
+
+    def __init__(self, elem_type, op1, op2):
+        self.elem_type = elem_type
+        self.op1 = op1
+        self.op2 = op2
+
+
+class New(Node):
+    __slots__ = ("var_type", "pure", "first", "free")
+    FIELDS = ("var_type",)
+    elem_type = InterpreterBase.NEW_NODE
+
+    def __init__(self, var_type):
+        self.var_type = var_type
+
+
+class IntLit(Node):
+    __slots__ = ("val", "pure", "first", "free")
+    FIELDS = ("val",)
+    elem_type = InterpreterBase.INT_NODE
+
+    def __init__(self, val):
+        self.val = val
+
+
+class BoolLit(Node):
+    __slots__ = ("val", "pure", "first", "free")
+    FIELDS = ("val",)
+    elem_type = InterpreterBase.BOOL_NODE
+
+    def __init__(self, val):
+        self.val = val
+
+
+class StringLit(Node):
+    __slots__ = ("val", "pure", "first", "free")
+    FIELDS = ("val",)
+    elem_type = InterpreterBase.STRING_NODE
+
+    def __init__(self, val):
+        self.val = val
+
+
+class NilLit(Node):
+    __slots__ = ("pure", "first", "free")
+    FIELDS = ()
+    elem_type = InterpreterBase.NIL_NODE
+
+
+class Var(Node):
+    __slots__ = ("name", "addr", "pure", "first", "free")
+    FIELDS = ("name",)
+    elem_type = InterpreterBase.VAR_NODE
+
+    def __init__(self, name):
+        self.name = name
+
+
+class FCall(Node):
+    __slots__ = ("name", "args", "pure", "first", "free")
+    FIELDS = ("name", "args")
+    elem_type = InterpreterBase.FCALL_NODE
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+
+# node class for each elem_type, for code that builds nodes from a kind (e.g. brewbin)
+NODE_CLASSES = {
+    cls.elem_type: cls
+    for cls in (
+        Program, Struct, FieldDef, Func, Arg, Assign, VarDef, If, Try, Catch, For, Raise,
+        Return, New, IntLit, BoolLit, StringLit, NilLit, Var, FCall,
+    )
+}
+for op in (InterpreterBase.NEG_NODE, InterpreterBase.NOT_NODE):
+    NODE_CLASSES[op] = UnaryOp
+for op in ("+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "&&", "||"):
+    NODE_CLASSES[op] = BinOp
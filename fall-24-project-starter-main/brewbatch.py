@@ -0,0 +1,170 @@
+import multiprocessing
+import sys
+import time
+from multiprocessing.connection import wait
+
+# Runs many Brewin programs across a pool of worker processes, e.g. an autograder suite.
+# run_batch imports the interpreter (and with it brewparse and its PLY tables) in the parent
+# before starting any worker, so forked workers, including the ones that replace a killed
+# worker, start with it loaded; with the spawn start method (Windows, macOS) each worker imports
+# it once instead.  A worker runs one program after another, each in a fresh Interpreter.  A
+# program that runs past its timeout has its worker killed and replaced; the other workers
+# carry on.
+#
+#   results = run_batch([(src, ["1", "2"]), (src2, None)], workers=4, timeout=5)
+#
+# returns one BatchResult per job, in the order of the jobs.  interp_kwargs (engine="bytecode",
+# ...) are passed to every Interpreter.
+
+
+class BatchResult:
+    def __init__(self, output, error_type=None, error_line=None, error=None, timed_out=False):
+        self.output = output  # get_output() of the run, [] if it timed out
+        self.error_type = error_type  # get_error_type_and_line() of the run
+        self.error_line = error_line
+        self.error = error  # the message of the exception that ended the run, if any
+        self.timed_out = timed_out
+        self.elapsed = None  # seconds, measured by the parent
+
+    def ok(self):
+        return self.error is None and not self.timed_out
+
+    def __repr__(self):
+        if self.timed_out:
+            return "BatchResult(timed out)"
+        if self.error is not None:
+            return f"BatchResult(error={self.error!r})"
+        return f"BatchResult(output={self.output!r})"
+
+
+def _worker(conn, interp_kwargs):
+    from interpreterv4sol import Interpreter  # already loaded when the worker was forked
+
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        index, src, inp = job
+        interp = Interpreter(console_output=False, inp=inp, **interp_kwargs)
+        error = None
+        try:
+            interp.run(src)
+        except Exception as e:  # Brewin errors are raised as plain Exceptions
+            error = str(e) or type(e).__name__
+        error_type, error_line = interp.get_error_type_and_line()
+        conn.send((index, BatchResult(list(interp.get_output()), error_type, error_line, error)))
+
+
+class _Worker:
+    def __init__(self, ctx, interp_kwargs):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker, args=(child_conn, interp_kwargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.job = None  # index of the running job
+        self.started = None
+        self.deadline = None
+
+    def start(self, index, src, inp, timeout):
+        self.conn.send((index, src, inp))
+        self.job = index
+        self.started = time.monotonic()
+        self.deadline = None if timeout is None else self.started + timeout
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+# jobs is an iterable of source strings or (source, inp) pairs; timeout is per program, in
+# seconds.  workers defaults to the number of CPUs.
+def run_batch(jobs, workers=None, timeout=None, **interp_kwargs):
+    jobs = [(job, None) if isinstance(job, str) else tuple(job) for job in jobs]
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, len(jobs)))
+    results = [None] * len(jobs)
+    if not jobs:
+        return results
+
+    import interpreterv4sol  # noqa: F401  loaded once here, for the workers to inherit
+
+    ctx = multiprocessing.get_context()
+    pool = [_Worker(ctx, interp_kwargs) for _ in range(workers)]
+    next_job = 0
+    try:
+        while True:
+            for worker in pool:
+                if worker.job is None and next_job < len(jobs):
+                    src, inp = jobs[next_job]
+                    worker.start(next_job, src, inp, timeout)
+                    next_job += 1
+            busy = [worker for worker in pool if worker.job is not None]
+            if not busy:
+                return results
+
+            deadlines = [worker.deadline for worker in busy if worker.deadline is not None]
+            wait_for = None
+            if deadlines:
+                wait_for = max(0, min(deadlines) - time.monotonic())
+            ready = wait([worker.conn for worker in busy], wait_for)
+
+            now = time.monotonic()
+            for i, worker in enumerate(pool):
+                if worker.job is None:
+                    continue
+                if worker.conn in ready:
+                    try:
+                        _, result = worker.conn.recv()
+                    except EOFError:  # the worker died, e.g. killed for running out of memory
+                        result = BatchResult([], error="Worker process died")
+                        worker.kill()
+                        pool[i] = _Worker(ctx, interp_kwargs)
+                elif worker.deadline is not None and now >= worker.deadline:
+                    result = BatchResult([], timed_out=True)
+                    worker.kill()
+                    pool[i] = _Worker(ctx, interp_kwargs)
+                else:
+                    continue
+                result.elapsed = now - worker.started
+                results[worker.job] = result
+                worker.job = None
+    finally:
+        for worker in pool:
+            if worker.job is None:
+                worker.stop()
+            else:
+                worker.kill()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"usage: python {sys.argv[0]} [-j WORKERS] [-t TIMEOUT] PROGRAM.br ...")
+        sys.exit(1)
+    args = sys.argv[1:]
+    options = {"-j": None, "-t": None}
+    while args and args[0] in options:
+        options[args[0]] = float(args[1])
+        args = args[2:]
+    sources = []
+    for path in args:
+        with open(path) as f:
+            sources.append(f.read())
+    num_workers = None if options["-j"] is None else int(options["-j"])
+    start = time.monotonic()
+    batch = run_batch(sources, workers=num_workers, timeout=options["-t"])
+    for path, res in zip(args, batch):
+        status = "timeout" if res.timed_out else ("ok" if res.error is None else res.error)
+        print(f"{path}: {status} ({res.elapsed:.2f}s, {len(res.output)} lines)")
+    print(f"{len(batch)} programs in {time.monotonic() - start:.2f}s")
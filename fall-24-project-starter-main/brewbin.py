@@ -0,0 +1,306 @@
+import mmap
+import sys
+
+from brewast import NODE_CLASSES, Node
+from element import Element
+
+# Compact binary encoding of the AST trees made by brewparse.parse_program (brewast nodes, or
+# Element trees), so a program can be shipped already parsed.  loads(dumps(ast)) rebuilds a
+# tree equal to ast (same node classes and types, same keys in the same order, same values), in
+# a fraction of the time lexing and parsing take.
+#
+# Layout: MAGIC, a version byte, the string table, the shape table, then the root value.
+#  - the string table is a varint count followed by each string as a varint byte length and
+#    its utf-8 bytes.  Every node type, key, name and string literal is stored once and
+#    referred to by its index, and the loader interns them, so equal strings share one object.
+#  - the shape table is a varint count followed by each shape as a varint key count, the string
+#    index of an elem_type and the string indexes of its keys.  Nodes of a type nearly always
+#    have the same keys, so every node refers to its shape instead of spelling them out.  A
+#    shape whose type and keys match a brewast class is loaded as that class, any other shape
+#    as an Element.
+#  - a value is a tag byte followed by its payload: nothing for None/False/True, a zigzag
+#    varint for an int, a string index for a str, a varint length and the items for a list, and
+#    for an Element the index of its shape and then the value of each key in order.  A brewast
+#    node with a line (the statements brewparse made) is tagged TAG_LINE_ELEMENT instead and
+#    has the line as a varint between its shape and its values, so profiles of a program loaded
+#    from here still have their lines.
+#
+# A bundle holds several programs in one file: BUNDLE_MAGIC, a version byte, a varint count,
+# a directory of (name, offset, length) entries and then the encoded programs.  Bundle mmaps
+# the file and decodes a program only when it is asked for.
+
+MAGIC = b"BRWA"
+BUNDLE_MAGIC = b"BRWB"
+VERSION = 2
+
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_STR = 4
+TAG_LIST = 5
+TAG_ELEMENT = 6
+TAG_LINE_ELEMENT = 7
+
+
+class BrewbinError(Exception):
+    pass
+
+
+def _write_varint(out, n):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _write_string(out, s):
+    data = s.encode("utf-8")
+    _write_varint(out, len(data))
+    out += data
+
+
+class _Encoder:
+    def __init__(self):
+        self.strings = {}
+        self.shapes = {}
+        self.body = bytearray()
+
+    def encode(self, value):
+        out = self.body
+        if value is None:
+            out.append(TAG_NONE)
+        elif value is True:
+            out.append(TAG_TRUE)
+        elif value is False:
+            out.append(TAG_FALSE)
+        elif isinstance(value, int):
+            out.append(TAG_INT)
+            _write_varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)  # zigzag
+        elif isinstance(value, str):
+            out.append(TAG_STR)
+            _write_varint(out, self.__string_index(value))
+        elif isinstance(value, list):
+            out.append(TAG_LIST)
+            _write_varint(out, len(value))
+            for item in value:
+                self.encode(item)
+        elif isinstance(value, Node):
+            line = getattr(value, "line", None)
+            out.append(TAG_ELEMENT if line is None else TAG_LINE_ELEMENT)
+            _write_varint(out, self.__shape_index(value.elem_type, value.FIELDS))
+            if line is not None:
+                _write_varint(out, line)
+            for _, item in value.items():
+                self.encode(item)
+        elif isinstance(value, Element):
+            out.append(TAG_ELEMENT)
+            _write_varint(out, self.__shape_index(value.elem_type, value.dict))
+            for item in value.dict.values():
+                self.encode(item)
+        else:
+            raise BrewbinError(f"Cannot encode {type(value).__name__} value {value!r}")
+
+    def finish(self):
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        _write_varint(out, len(self.strings))
+        for s in self.strings:  # dicts keep insertion order, which is index order
+            _write_string(out, s)
+        _write_varint(out, len(self.shapes))
+        for shape in self.shapes:
+            _write_varint(out, len(shape) - 1)
+            for index in shape:
+                _write_varint(out, index)
+        out += self.body
+        return bytes(out)
+
+    def __string_index(self, s):
+        index = self.strings.get(s)
+        if index is None:
+            index = self.strings[s] = len(self.strings)
+        return index
+
+    def __shape_index(self, elem_type, keys):
+        shape = (self.__string_index(elem_type),) + tuple(self.__string_index(key) for key in keys)
+        index = self.shapes.get(shape)
+        if index is None:
+            index = self.shapes[shape] = len(self.shapes)
+        return index
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_string(data, pos):
+    n, pos = _read_varint(data, pos)
+    return bytes(data[pos:pos + n]).decode("utf-8"), pos + n
+
+
+def _read_header(data, pos, magic):
+    if bytes(data[pos:pos + len(magic)]) != magic:
+        raise BrewbinError("Not a brewbin file")
+    version = data[pos + len(magic)]
+    if version != VERSION:
+        raise BrewbinError(f"Unsupported brewbin version {version}")
+    return pos + len(magic) + 1
+
+
+# data is anything indexable by int that yields bytes: bytes, bytearray, mmap, memoryview
+def _decode_program(data, pos):
+    pos = _read_header(data, pos, MAGIC)
+    strings = []
+    count, pos = _read_varint(data, pos)
+    for _ in range(count):
+        s, pos = _read_string(data, pos)
+        strings.append(sys.intern(s))
+    shapes = []
+    count, pos = _read_varint(data, pos)
+    for _ in range(count):
+        n, pos = _read_varint(data, pos)
+        shape = []
+        for _ in range(n + 1):
+            index, pos = _read_varint(data, pos)
+            shape.append(strings[index])
+        elem_type, keys = shape[0], tuple(shape[1:])
+        cls = NODE_CLASSES.get(elem_type)
+        if cls is not None and cls.FIELDS != keys:
+            cls = None
+        shapes.append((elem_type, keys, cls, cls is not None and "elem_type" in cls.__slots__))
+
+    constants = (None, False, True)  # TAG_NONE, TAG_FALSE, TAG_TRUE
+
+    # the hot loop, so varints below 0x80 (nearly all of them) are read inline
+    def decode():
+        nonlocal pos
+        tag = data[pos]
+        pos += 1
+        if tag <= TAG_TRUE:
+            return constants[tag]
+        n = data[pos]
+        pos += 1
+        if n >= 0x80:
+            n, pos = _read_varint(data, pos - 1)
+        if tag == TAG_ELEMENT or tag == TAG_LINE_ELEMENT:
+            elem_type, keys, cls, own_type = shapes[n]
+            line = None
+            if tag == TAG_LINE_ELEMENT:
+                line, pos = _read_varint(data, pos)
+            if cls is None:
+                node = Element.__new__(Element)  # filled in directly, skipping __init__
+                node.elem_type = elem_type
+                node.dict = fields = {}
+                for key in keys:
+                    fields[key] = decode()
+                return node
+            node = cls.__new__(cls)
+            if own_type:
+                node.elem_type = elem_type
+            if line is not None:
+                node.line = line
+            for key in keys:
+                setattr(node, key, decode())
+            return node
+        if tag == TAG_STR:
+            return strings[n]
+        if tag == TAG_LIST:
+            return [decode() for _ in range(n)]
+        if tag == TAG_INT:
+            return -((n + 1) >> 1) if n & 1 else n >> 1
+        raise BrewbinError(f"Bad tag {tag}")
+
+    return decode()
+
+
+def dumps(ast):
+    encoder = _Encoder()
+    encoder.encode(ast)
+    return encoder.finish()
+
+
+def loads(data, offset=0):
+    try:
+        return _decode_program(data, offset)
+    except (IndexError, UnicodeDecodeError) as e:
+        raise BrewbinError(f"Truncated or corrupt brewbin data: {e}") from e
+
+
+def dump(ast, path):
+    with open(path, "wb") as f:
+        f.write(dumps(ast))
+
+
+def load(path):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return loads(data)
+
+
+def dump_bundle(programs, path):
+    names = list(programs)
+    blobs = [dumps(programs[name]) for name in names]
+    directory = bytearray()
+    offset = 0
+    for name, blob in zip(names, blobs):
+        _write_string(directory, name)
+        _write_varint(directory, offset)
+        _write_varint(directory, len(blob))
+        offset += len(blob)
+    header = bytearray(BUNDLE_MAGIC)
+    header.append(VERSION)
+    _write_varint(header, len(names))
+    # offsets in the directory are relative to the first program, right after the directory
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(directory)
+        for blob in blobs:
+            f.write(blob)
+
+
+class Bundle:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            pos = _read_header(self.data, 0, BUNDLE_MAGIC)
+            count, pos = _read_varint(self.data, pos)
+            entries = []
+            for _ in range(count):
+                name, pos = _read_string(self.data, pos)
+                offset, pos = _read_varint(self.data, pos)
+                length, pos = _read_varint(self.data, pos)
+                entries.append((name, offset, length))
+        except IndexError as e:
+            self.data.close()
+            raise BrewbinError(f"Truncated brewbin bundle: {e}") from e
+        except BrewbinError:
+            self.data.close()
+            raise
+        self.directory = {name: (pos + offset, length) for name, offset, length in entries}
+
+    def names(self):
+        return list(self.directory)
+
+    def get(self, name):
+        if name not in self.directory:
+            raise KeyError(name)
+        offset, _ = self.directory[name]
+        return loads(self.data, offset)
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,138 @@
+import os
+import sys
+
+from ply import lex, yacc
+
+# Startup caches for brewlex/brewparse, both off unless their environment variable is set.
+#  - BREWIN_TABLE_DIR: directory (may be read-only) holding lexer and parser tables built ahead
+#    of time with `python brewcache.py DIR`.  They are loaded with optimize=True, so PLY neither
+#    validates the grammar nor rebuilds the LALR tables.  The directory also holds the signature
+#    of the grammar sources the tables were built from; tables whose signature no longer
+#    matches are ignored and PLY builds its tables the usual way.
+#  - BREWIN_AST_CACHE: directory where parse_program keeps the AST of every program it parsed,
+#    keyed by a hash of the source (and of the grammar, brewbin.py and brewast.py, so ASTs
+#    saved in an older format or node layout are not read back), so a repeated program is
+#    neither lexed nor parsed again.  The ASTs are stored in the brewbin format.
+# The point is a fast start, so the modules only these caches need are imported when they are
+# first used.
+
+TABLE_DIR = os.environ.get("BREWIN_TABLE_DIR")
+AST_CACHE_DIR = os.environ.get("BREWIN_AST_CACHE")
+LEXTAB = "brewin_lextab"
+PARSETAB = "brewin_parsetab"
+SIGNATURE_FILE = "brewin_tables.sig"
+GRAMMAR_SOURCES = ("brewlex.py", "brewparse.py")
+# a cached AST also depends on how it is serialized and on the node classes it is rebuilt as
+AST_SOURCES = GRAMMAR_SOURCES + ("brewbin.py", "brewast.py")
+
+_signature = None
+_ast_signature = None
+
+
+def _hash_sources(names):
+    import hashlib
+
+    h = hashlib.sha256(f"{lex.__tabversion__} {yacc.__tabversion__}".encode())
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in names:
+        with open(os.path.join(src_dir, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+# hash of everything the tables are generated from
+def grammar_signature():
+    global _signature
+    if _signature is None:
+        _signature = _hash_sources(GRAMMAR_SOURCES)
+    return _signature
+
+
+# hash of everything a cached AST depends on
+def ast_signature():
+    global _ast_signature
+    if _ast_signature is None:
+        _ast_signature = _hash_sources(AST_SOURCES)
+    return _ast_signature
+
+
+# the pre-built table module called name, or None if there is none for the current grammar
+def load_table(name):
+    if TABLE_DIR is None:
+        return None
+    import importlib.util
+
+    try:
+        with open(os.path.join(TABLE_DIR, SIGNATURE_FILE)) as f:
+            if f.read().strip() != grammar_signature():
+                return None
+        spec = importlib.util.spec_from_file_location(name, os.path.join(TABLE_DIR, name + ".py"))
+        table = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(table)
+    except (OSError, ImportError):
+        return None
+    return table
+
+
+def build_tables(out_dir):
+    import py_compile
+
+    import brewlex
+    import brewparse
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name in (LEXTAB, PARSETAB):
+        if os.path.exists(os.path.join(out_dir, name + ".py")):
+            os.remove(os.path.join(out_dir, name + ".py"))
+    # written from the lexer brewlex built, as lex(module=brewlex) would see the token rules
+    # in alphabetical rather than definition order, which matters for overlapping rules
+    brewlex.lexer.writetab(LEXTAB, out_dir)
+    yacc.yacc(module=brewparse, tabmodule=PARSETAB, outputdir=out_dir, debug=False)
+    for name in (LEXTAB, PARSETAB):
+        py_compile.compile(os.path.join(out_dir, name + ".py"))  # so loading skips compiling them
+    with open(os.path.join(out_dir, SIGNATURE_FILE), "w") as f:
+        f.write(grammar_signature() + "\n")
+
+
+def _ast_path(program):
+    import hashlib
+
+    key = hashlib.sha256((ast_signature() + "\0" + program).encode()).hexdigest()
+    return os.path.join(AST_CACHE_DIR, key + ".ast")
+
+
+# the cached AST of program, or None
+def load_ast(program):
+    if AST_CACHE_DIR is None:
+        return None
+    import brewbin
+
+    try:
+        with open(_ast_path(program), "rb") as f:
+            return brewbin.loads(f.read())
+    except (OSError, brewbin.BrewbinError):
+        return None
+
+
+# the cache is best effort, so a directory we can't write to just means no caching
+def store_ast(program, ast):
+    if AST_CACHE_DIR is None:
+        return
+    import brewbin
+
+    path = _ast_path(program)
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # written under another name so readers never see half a file
+    try:
+        os.makedirs(AST_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(brewbin.dumps(ast))
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(f"usage: python {sys.argv[0]} TABLE_DIR")
+        sys.exit(1)
+    build_tables(sys.argv[1])
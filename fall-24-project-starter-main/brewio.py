@@ -0,0 +1,201 @@
+import mmap
+import sys
+from collections import deque
+
+# Output sinks for InterpreterBase(output_sink=...).  Without a sink, output() prints every line
+# as it comes and keeps all of them in output_log.  A sink takes over both jobs:
+#  - BufferedSink collects lines and writes them to a stream in one call per buffer_size
+#    characters (or once, at the end of the run, when buffer_size is None).  With keep_log it
+#    also keeps every line for get_output(), otherwise it keeps nothing (streaming).
+#  - CaptureSink writes nothing and keeps the lines for get_output(), at most max_lines of
+#    them (the most recent ones), so a test harness can bound the memory a run uses.
+# A sink has write(line), flush(), lines() and reset(); every interpreter's run() calls
+# flush_output() in a finally, so the end of the output is written even if the run fails.
+
+
+class BufferedSink:
+    BUFFER_SIZE = 1 << 16
+
+    # stream defaults to sys.stdout as it is when the buffer is written
+    def __init__(self, stream=None, buffer_size=BUFFER_SIZE, keep_log=False):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.keep_log = keep_log
+        self.reset()
+
+    def reset(self):
+        self.pending = []
+        self.pending_size = 0
+        self.log = []
+
+    def write(self, line):
+        self.pending.append(line)
+        if self.keep_log:
+            self.log.append(line)
+        if self.buffer_size is not None:
+            self.pending_size += len(line) + 1
+            if self.pending_size >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        stream = self.stream if self.stream is not None else sys.stdout
+        self.pending.append("")  # for the newline after the last line
+        stream.write("\n".join(self.pending))
+        stream.flush()
+        self.pending = []
+        self.pending_size = 0
+
+    def lines(self):
+        return self.log
+
+
+class CaptureSink:
+    # max_lines None keeps every line
+    def __init__(self, max_lines=None):
+        self.max_lines = max_lines
+        self.reset()
+
+    def reset(self):
+        self.log = deque(maxlen=self.max_lines)
+        self.written = 0
+
+    def write(self, line):
+        self.log.append(line)
+        self.written += 1
+
+    def flush(self):
+        pass
+
+    # the lines kept; dropped() of the earliest ones were let go to stay within max_lines
+    def lines(self):
+        return list(self.log)
+
+    def dropped(self):
+        return self.written - len(self.log)
+
+
+# Input providers for InterpreterBase(input_provider=...), in place of the inp list or input().
+# Each input is one line (or one item of an iterable); next_str() returns it as inputs() sees
+# it and next_int() parses it for inputi(), straight from the bytes or item where it can.  Both
+# raise EOFError when the input runs out, as input() does.
+#  - IterInput pulls items from any iterable, e.g. a generator, only when they are asked for.
+#  - FileInput reads an open file object, and MmapInput a memory-mapped file, 64 KiB at a time,
+#    splitting each chunk into lines in one go; neither holds more of the file than that.
+
+
+class IterInput:
+    def __init__(self, iterable):
+        self.items = iter(iterable)
+
+    def __next(self):
+        try:
+            return next(self.items)
+        except StopIteration:
+            raise EOFError("No more input") from None
+
+    def next_str(self):
+        return str(self.__next())
+
+    def next_int(self):
+        item = self.__next()
+        if type(item) is int:
+            return item
+        return int(item)
+
+
+# splits what read(size) returns, str or bytes, into lines a chunk at a time, so taking the next
+# line is a list index rather than a search
+class _LineReader:
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self):
+        self.lines = []
+        self.index = 0
+        self.rest = None  # the unfinished line at the end of the last chunk
+
+    def _read(self, size):
+        pass
+
+    def next_str(self):
+        return self._decode(self._next_line())
+
+    def next_int(self):
+        index = self.index
+        if index == len(self.lines):
+            self._fill()
+            index = 0
+        self.index = index + 1
+        return int(self.lines[index])  # int() takes str or bytes and skips whitespace
+
+    def _next_line(self):
+        if self.index == len(self.lines):
+            self._fill()
+        line = self.lines[self.index]
+        self.index += 1
+        return line
+
+    def _fill(self):
+        while True:
+            chunk = self._read(_LineReader.CHUNK_SIZE)
+            if not chunk:
+                if not self.rest:
+                    raise EOFError("No more input")
+                self.lines = [self.rest]  # a last line with no newline after it
+                self.rest = chunk
+                self.index = 0
+                return
+            if self.rest:
+                chunk = self.rest + chunk
+            lines = chunk.split("\n" if isinstance(chunk, str) else b"\n")
+            self.rest = lines.pop()
+            if lines:
+                self.lines = lines
+                self.index = 0
+                return
+
+    def _decode(self, line):
+        if isinstance(line, bytes):
+            line = line.decode(self.encoding)
+        if line[-1:] == "\r":
+            line = line[:-1]
+        return line
+
+
+# f can be opened in text or binary mode
+class FileInput(_LineReader):
+    def __init__(self, f, encoding="utf-8"):
+        super().__init__()
+        self.f = f
+        self.encoding = encoding
+
+    def _read(self, size):
+        return self.f.read(size)
+
+
+class MmapInput(_LineReader):
+    def __init__(self, path, encoding="utf-8"):
+        super().__init__()
+        with open(path, "rb") as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # an empty file cannot be mapped
+                self.data = b""
+        self.encoding = encoding
+        self.pos = 0
+
+    def _read(self, size):
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        return chunk
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
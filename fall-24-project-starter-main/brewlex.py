@@ -1,5 +1,6 @@
 
 from ply import lex
+from brewcache import LEXTAB, load_table
 
 reserved = (
     "VAR",
@@ -132,5 +133,9 @@ def t_error(t):
 def reset_lineno():
     lexer.lineno = 1
 
-# Build the lexer
-lexer = lex.lex()
+# Build the lexer, from pre-built tables if there are any (see brewcache.py)
+lextab = load_table(LEXTAB)
+if lextab is None:
+    lexer = lex.lex()
+else:
+    lexer = lex.lex(optimize=True, lextab=lextab)
@@ -0,0 +1,608 @@
+import copy
+
+from env_v4sol import EnvironmentManager
+from intbase import InterpreterBase, ErrorType
+from resolver_v4sol import bind_params
+from strictness_v4sol import speculate
+from type_valuev4sol import (
+    BrewinRaise, ExecStatus, Type, Value, LazyValue, bool_value, create_value, get_printable,
+    int_value, make_value,
+)
+
+# Bytecode engine for interpreterv4sol: the AST is lowered once into flat instruction streams
+# (one per function and one per lazily-evaluated expression) that a single dispatch loop runs.
+# Each code object holds two parallel lists, the opcodes and their arguments.  Values are left
+# on an operand stack; a Brewin exception unwinds to the innermost SETUP_TRY handler of the
+# running frame, unwinding the frames of calls in progress that have none, or is returned to the
+# caller of VirtualMachine.execute as (ExecStatus.EXCEPTION, value).
+
+
+class Opcode:
+    LOAD_CONST = 1  # push arg
+    LOAD_VAR = 2  # push the value of the variable at (depth, slot) arg, forcing it if it is lazy
+    MAKE_THUNK = 3  # push a LazyValue of code object arg with the variables it reads (arg.free)
+    STORE_VAR = 4  # pop a value and assign it to the variable at (depth, slot) arg
+    DEFINE_VAR = 5  # define a nil variable in the next slot of the innermost block
+    BINARY_OP = 6  # pop two operands and push the result of operator arg
+    UNARY_OP = 7  # pop an operand and push the result of (operator, type, function) arg
+    LOGICAL_OP = 8  # check the bool on top; if it decides || or && push the result and jump
+    CHECK_BOOL = 9  # raise a type error unless the top of the stack is a bool
+    JUMP = 10  # continue at arg
+    JUMP_IF_FALSE = 11  # pop a bool (arg[1] names the statement on type errors) and jump to arg[0] if false
+    CALL = 12  # pop the arguments of (name, count, function, error message) arg and call it
+    FORCE = 13  # force the lazy value on top of the stack
+    CALL_PRINT = 14  # pop the text PRINT_ARG built and print it
+    CALL_INPUT = 15  # read a value for (name, argument count) arg
+    POP_TOP = 16  # discard the top of the stack
+    PUSH_BLOCK = 17  # open a block scope
+    POP_BLOCK = 18  # close a block scope
+    SETUP_TRY = 19  # install a handler at arg for the instructions up to POP_TRY
+    POP_TRY = 20  # remove the innermost handler
+    MATCH_EXCEPTION = 21  # if the exception on top is not named arg[0], jump to arg[1]
+    RAISE = 22  # pop a value and raise it as a Brewin exception
+    RERAISE = 23  # re-raise the exception on top of the stack
+    RETURN_VALUE = 24  # return a copy of the top of the stack from the function
+    RETURN_NIL = 25  # return nil from the function
+    END_FUNC = 26  # fall off the end of the function
+    END_THUNK = 27  # return the top of the stack from a lazy expression
+    TRACE = 28  # print the statement arg (trace_output)
+    NAME_ERROR = 29  # report a name error with message arg (unresolved or duplicate names)
+    SPECULATE = 30  # push the value of pure expression arg[0] if it is safe now, else MAKE_THUNK arg[1]
+    STEP = 31  # count a statement against the resource limits (see limits_v4sol.py)
+    LOAD_SHARED = 32  # push the value of the variable at arg as it is, lazy or not
+    PRINT_ARG = 33  # pop a print argument and append its text to the text below it
+
+
+# opcode -> name, for disassembly
+OPCODE_NAMES = {
+    value: name for name, value in vars(Opcode).items() if isinstance(value, int)
+}
+
+
+class CodeObject:
+    def __init__(self, name):
+        self.name = name
+        self.ops = []
+        self.args = []
+        self.free = None  # for the code of a lazy expression, the variables it reads
+
+    def emit(self, op, arg=None):
+        self.ops.append(op)
+        self.args.append(arg)
+        return len(self.ops) - 1
+
+    # fill in the jump target of a previously emitted instruction
+    def patch(self, index, arg):
+        self.args[index] = arg
+
+    def here(self):
+        return len(self.ops)
+
+    def __str__(self):
+        lines = [f"code {self.name}:"]
+        for i, (op, arg) in enumerate(zip(self.ops, self.args)):
+            if isinstance(arg, CodeObject):
+                arg = f"<code {arg.name}>"
+            elif op == Opcode.SPECULATE:
+                arg = f"<code {arg[1].name}>"
+            elif isinstance(arg, Value):
+                arg = f"{arg.type()} {arg.value()!r}"
+            elif isinstance(arg, tuple) and op in (Opcode.CALL, Opcode.BINARY_OP, Opcode.UNARY_OP):
+                arg = arg[0]
+            lines.append(f"  {i:4} {OPCODE_NAMES[op]:<16} {'' if arg is None else arg}")
+        return "\n".join(lines)
+
+
+# a user-defined function; its code is filled in once every function has been declared
+class FunctionCode:
+    def __init__(self, name, param_slots):
+        self.name = name
+        self.param_slots = param_slots
+        self.code = None
+
+
+class BytecodeCompiler:
+    NIL_VALUE = create_value(InterpreterBase.NIL_DEF)
+    BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<="}
+
+    def __init__(self, interp):
+        self.interp = interp
+
+    # compile every function in the program (already annotated by resolver_v4sol), returning the
+    # code that calls main()
+    def compile(self, ast):
+        func_defs = {}
+        for func_def in ast.functions:
+            func_defs[(func_def.name, len(func_def.args))] = func_def
+        self.func_table = {}
+        for (func_name, num_params), func_def in func_defs.items():
+            if func_name not in self.func_table:
+                self.func_table[func_name] = {}
+            self.func_table[func_name][num_params] = FunctionCode(
+                func_name, func_def.param_slots
+            )
+        for (func_name, num_params), func_def in func_defs.items():
+            code = CodeObject(func_name)
+            self.__compile_statements(code, func_def.statements)
+            code.emit(Opcode.END_FUNC)
+            self.func_table[func_name][num_params].code = code
+
+        entry = CodeObject("<program>")
+        self.__emit_call(entry, "main", 0)
+        entry.emit(Opcode.END_THUNK)
+        return entry
+
+    # a block: the statements run in a new scope
+    def __compile_statements(self, code, statements):
+        code.emit(Opcode.PUSH_BLOCK)
+        for statement in statements:
+            if self.interp.trace_output:
+                code.emit(Opcode.TRACE, statement)
+            if self.interp.limits is not None:
+                code.emit(Opcode.STEP)
+            self.__compile_statement(code, statement)
+        code.emit(Opcode.POP_BLOCK)
+
+    def __compile_statement(self, code, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.FCALL_NODE:
+            self.__compile_call(code, statement)
+            code.emit(Opcode.POP_TOP)
+        elif kind == "=":
+            self.__compile_expr(code, statement.expression, statement.strict)
+            if statement.addr is None:
+                var_name = statement.name
+                code.emit(Opcode.NAME_ERROR, f"Undefined variable {var_name} in assignment")
+            else:
+                code.emit(Opcode.STORE_VAR, statement.addr)
+        elif kind == InterpreterBase.VAR_DEF_NODE:
+            if statement.addr is None:
+                var_name = statement.name
+                code.emit(Opcode.NAME_ERROR, f"Duplicate definition for variable {var_name}")
+            else:
+                code.emit(Opcode.DEFINE_VAR)
+        elif kind == InterpreterBase.RETURN_NODE:
+            expr_ast = statement.expression
+            if expr_ast is None:
+                code.emit(Opcode.RETURN_NIL)
+            elif expr_ast.elem_type == InterpreterBase.VAR_NODE:
+                # a shared lazy value is returned behind a new one (see END_THUNK)
+                self.__compile_lazy(code, expr_ast)
+                code.emit(Opcode.RETURN_VALUE)
+            else:
+                self.__compile_expr(code, expr_ast, False)
+                code.emit(Opcode.RETURN_VALUE)
+        elif kind == InterpreterBase.RAISE_NODE:
+            self.__compile_expr(code, statement.exception_type, True)
+            code.emit(Opcode.RAISE)
+        elif kind == InterpreterBase.IF_NODE:
+            self.__compile_if(code, statement)
+        elif kind == InterpreterBase.FOR_NODE:
+            self.__compile_for(code, statement)
+        elif kind == InterpreterBase.TRY_NODE:
+            self.__compile_try(code, statement)
+        # bare expressions other than calls are never evaluated
+
+    def __compile_if(self, code, if_ast):
+        self.__compile_expr(code, if_ast.condition, True)
+        jump_to_else = code.emit(Opcode.JUMP_IF_FALSE)
+        self.__compile_statements(code, if_ast.statements)
+        else_statements = if_ast.else_statements
+        if else_statements is None:
+            code.patch(jump_to_else, (code.here(), "if"))
+            return
+        jump_to_end = code.emit(Opcode.JUMP)
+        code.patch(jump_to_else, (code.here(), "if"))
+        self.__compile_statements(code, else_statements)
+        code.patch(jump_to_end, code.here())
+
+    def __compile_for(self, code, for_ast):
+        self.__compile_statement(code, for_ast.init)
+        loop_start = code.here()
+        self.__compile_expr(code, for_ast.condition, True)
+        jump_to_end = code.emit(Opcode.JUMP_IF_FALSE)
+        self.__compile_statements(code, for_ast.statements)
+        self.__compile_statement(code, for_ast.update)
+        code.emit(Opcode.JUMP, loop_start)
+        code.patch(jump_to_end, (code.here(), "for"))
+
+    # the handler code finds the exception value on the stack and tests each catcher in order
+    def __compile_try(self, code, try_ast):
+        setup = code.emit(Opcode.SETUP_TRY)
+        self.__compile_statements(code, try_ast.statements)
+        code.emit(Opcode.POP_TRY)
+        jumps_to_end = [code.emit(Opcode.JUMP)]
+        code.patch(setup, code.here())
+        for catcher_ast in try_ast.catchers:
+            match = code.emit(Opcode.MATCH_EXCEPTION)
+            code.emit(Opcode.POP_TOP)
+            self.__compile_statements(code, catcher_ast.statements)
+            jumps_to_end.append(code.emit(Opcode.JUMP))
+            code.patch(match, (catcher_ast.exception_type, code.here()))
+        code.emit(Opcode.RERAISE)
+        for jump in jumps_to_end:
+            code.patch(jump, code.here())
+
+    # leaves the (possibly lazy) result of the call on the stack
+    def __compile_call(self, code, call_node):
+        func_name = call_node.name
+        actual_args = call_node.args
+        if func_name == "print":
+            # each argument is converted as soon as it is evaluated, as the tree walker does, so
+            # one that can't be printed fails before the arguments after it run
+            code.emit(Opcode.LOAD_CONST, "")
+            for arg in actual_args:
+                self.__compile_expr(code, arg, True)
+                code.emit(Opcode.PRINT_ARG)
+            code.emit(Opcode.CALL_PRINT)
+        elif func_name == "inputi" or func_name == "inputs":
+            if len(actual_args) == 1:
+                self.__compile_expr(code, actual_args[0], True)
+            code.emit(Opcode.CALL_INPUT, (func_name, len(actual_args)))
+        else:
+            for arg in actual_args:
+                self.__compile_expr(code, arg, False)
+            self.__emit_call(code, func_name, len(actual_args))
+
+    # the callee is bound here, but a missing function is only reported when the call runs
+    def __emit_call(self, code, func_name, num_args):
+        func = None
+        missing = f"Function {func_name} not found"
+        if func_name in self.func_table:
+            func = self.func_table[func_name].get(num_args)
+            missing = f"Function {func_name} taking {num_args} params not found"
+        code.emit(Opcode.CALL, (func_name, num_args, func, missing))
+
+    # push a LazyValue of the expression, or its value when speculate() can tell it now
+    def __compile_lazy(self, code, expr_ast):
+        kind = expr_ast.elem_type
+        thunk = CodeObject(f"<lazy {kind}>")
+        thunk.free = expr_ast.free
+        if kind == InterpreterBase.FCALL_NODE:
+            # a tail call: END_THUNK forces the lazy value it returns in place of this frame
+            self.__compile_call(thunk, expr_ast)
+        else:
+            self.__compile_expr(thunk, expr_ast, True)
+        thunk.emit(Opcode.END_THUNK)
+        if expr_ast.pure:
+            code.emit(Opcode.SPECULATE, (expr_ast, thunk))
+        else:
+            code.emit(Opcode.MAKE_THUNK, thunk)
+
+    # compile an expression; when eager is False, a variable gives its value as it is (shared) and
+    # anything else but a literal produces a LazyValue
+    def __compile_expr(self, code, expr_ast, eager):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.NIL_NODE:
+            code.emit(Opcode.LOAD_CONST, BytecodeCompiler.NIL_VALUE)
+            return
+        if kind == InterpreterBase.INT_NODE:
+            code.emit(Opcode.LOAD_CONST, int_value(expr_ast.val))
+            return
+        if kind == InterpreterBase.STRING_NODE:
+            code.emit(Opcode.LOAD_CONST, Value(Type.STRING, expr_ast.val))
+            return
+        if kind == InterpreterBase.BOOL_NODE:
+            code.emit(Opcode.LOAD_CONST, bool_value(expr_ast.val))
+            return
+
+        if not eager:
+            if kind == InterpreterBase.VAR_NODE and expr_ast.addr is not None:
+                # every alias of a lazy value shares its result (see Interpreter.__eval_expr)
+                code.emit(Opcode.LOAD_SHARED, expr_ast.addr)
+            else:
+                self.__compile_lazy(code, expr_ast)
+            return
+
+        if kind == InterpreterBase.VAR_NODE:
+            if expr_ast.addr is None:
+                var_name = expr_ast.name
+                code.emit(Opcode.NAME_ERROR, f"Variable {var_name} not found")
+            else:
+                code.emit(Opcode.LOAD_VAR, expr_ast.addr)
+        elif kind == InterpreterBase.FCALL_NODE:
+            self.__compile_call(code, expr_ast)
+            code.emit(Opcode.FORCE)
+        elif kind in BytecodeCompiler.BIN_OPS:
+            self.__compile_expr(code, expr_ast.op1, True)
+            self.__compile_expr(code, expr_ast.op2, True)
+            impls = {t: ops.get(kind) for t, ops in self.interp.op_to_lambda.items()}
+            code.emit(Opcode.BINARY_OP, (kind, impls, kind == "==" or kind == "!=", kind == "/"))
+        elif kind == "||" or kind == "&&":
+            self.__compile_expr(code, expr_ast.op1, True)
+            short_circuit = code.emit(Opcode.LOGICAL_OP)
+            self.__compile_expr(code, expr_ast.op2, True)
+            code.emit(Opcode.CHECK_BOOL, kind)
+            code.patch(short_circuit, (kind, kind == "||", code.here()))
+        elif kind == InterpreterBase.NEG_NODE:
+            self.__compile_expr(code, expr_ast.op1, True)
+            code.emit(Opcode.UNARY_OP, (kind, Type.INT, lambda x: -1 * x))
+        elif kind == InterpreterBase.NOT_NODE:
+            self.__compile_expr(code, expr_ast.op1, True)
+            code.emit(Opcode.UNARY_OP, (kind, Type.BOOL, lambda x: not x))
+        else:
+            code.emit(Opcode.LOAD_CONST, None)
+
+
+class VirtualMachine:
+    NIL_VALUE = create_value(InterpreterBase.NIL_DEF)
+    DIV_ZERO = Value(Type.STRING, "div0")
+    # a Brewin call usually takes two frames, one for the call and one forcing the lazy value it
+    # returns, so this allows about 1e6 levels of recursion
+    MAX_DEPTH = 2000000
+
+    # max_depth bounds the frames (calls and lazy evaluations in progress) on the frame stack
+    def __init__(self, interp, max_depth=MAX_DEPTH):
+        self.interp = interp
+        self.env = EnvironmentManager()
+        self.max_depth = max_depth
+
+    # run the entry code produced by BytecodeCompiler.compile()
+    def run(self, entry):
+        self.env.push_func()
+        return self.execute(entry)
+
+    # run a code object to completion in the current function environment, returning
+    # (ExecStatus, value) like the tree walker.  Calls and lazy evaluations do not recurse into
+    # execute: the running frame is saved on the frames list and the callee runs in this same
+    # loop, so the depth of Brewin recursion is bounded by max_depth rather than by the Python
+    # stack.  A frame's thunk is the LazyValue it is evaluating, None for a function call.
+    def execute(self, code):
+        ops = code.ops
+        args = code.args
+        env = self.env
+        interp = self.interp
+        limits = interp.limits
+        max_depth = self.max_depth
+        frames = []  # (ops, args, stack, handlers, depth, pc, thunk) of each suspended frame
+        stack = []
+        handlers = []  # (handler pc, block depth, stack depth) for each active try
+        depth = 0  # blocks opened by the running frame
+        pc = 0
+        thunk = None
+        while True:
+            try:
+                while True:
+                    op = ops[pc]
+                    arg = args[pc]
+                    pc += 1
+                    if op == Opcode.LOAD_VAR:
+                        val = env.get(*arg)
+                        if val.evaluated():
+                            stack.append(val)
+                            continue
+                        callee = val.ast()
+                        env_to_eval = val.env()
+                    elif op == Opcode.LOAD_CONST:
+                        stack.append(arg)
+                        continue
+                    elif op == Opcode.BINARY_OP:
+                        right = stack.pop()
+                        left = stack[-1]
+                        oper, impls, any_types, is_div = arg
+                        left_type = left.type()
+                        if not any_types and left_type != right.type():
+                            interp.error(
+                                ErrorType.TYPE_ERROR, f"Incompatible types for {oper} operation"
+                            )
+                        f = impls.get(left_type)
+                        if f is None:
+                            interp.error(
+                                ErrorType.TYPE_ERROR,
+                                f"Incompatible operator {oper} for type {left_type}",
+                            )
+                        if is_div and right.value() == 0:
+                            raise BrewinRaise(VirtualMachine.DIV_ZERO)
+                        stack[-1] = f(left, right)
+                        continue
+                    elif op == Opcode.MAKE_THUNK:
+                        stack.append(LazyValue(arg, env.capture(arg.free)))
+                        continue
+                    elif op == Opcode.SPECULATE:
+                        value = speculate(arg[0], env, interp.op_to_lambda)
+                        if value is None:
+                            value = LazyValue(arg[1], env.capture(arg[1].free))
+                        stack.append(value)
+                        continue
+                    elif op == Opcode.STORE_VAR:
+                        env.set(*arg, stack.pop())
+                        continue
+                    elif op == Opcode.JUMP_IF_FALSE:
+                        cond = stack.pop()
+                        if cond.type() != Type.BOOL:
+                            interp.error(
+                                ErrorType.TYPE_ERROR, f"Incompatible type for {arg[1]} condition"
+                            )
+                        if not cond.value():
+                            pc = arg[0]
+                        continue
+                    elif op == Opcode.JUMP:
+                        pc = arg
+                        continue
+                    elif op == Opcode.PUSH_BLOCK:
+                        env.push_block()
+                        depth += 1
+                        continue
+                    elif op == Opcode.POP_BLOCK:
+                        env.pop_block()
+                        depth -= 1
+                        continue
+                    elif op == Opcode.CALL:
+                        func_name, num_args, func, missing = arg
+                        if func is None:
+                            interp.error(ErrorType.NAME_ERROR, missing)
+                        values = []
+                        if num_args:
+                            values = stack[-num_args:]  # shared with the callee, not copied
+                            del stack[-num_args:]
+                        if len(frames) >= max_depth:
+                            self.__overflow()
+                        frames.append((ops, args, stack, handlers, depth, pc, thunk))
+                        env.push_func([bind_params(func.param_slots, values)])
+                        ops = func.code.ops
+                        args = func.code.args
+                        stack = []
+                        handlers = []
+                        depth = 0
+                        pc = 0
+                        thunk = None
+                        continue
+                    elif op == Opcode.FORCE:
+                        val = stack[-1]
+                        if val.evaluated():
+                            continue
+                        stack.pop()
+                        callee = val.ast()
+                        env_to_eval = val.env()
+                    elif op == Opcode.POP_TOP:
+                        stack.pop()
+                        continue
+                    elif op == Opcode.UNARY_OP:
+                        oper, t, f = arg
+                        value_obj = stack[-1]
+                        if value_obj.type() != t:
+                            interp.error(
+                                ErrorType.TYPE_ERROR, f"Incompatible type for {oper} operation"
+                            )
+                        stack[-1] = make_value(t, f(value_obj.value()))
+                        continue
+                    elif op == Opcode.LOGICAL_OP:
+                        oper, short_circuit_on, end = arg
+                        left = stack.pop()
+                        if left.type() != Type.BOOL:
+                            interp.error(
+                                ErrorType.TYPE_ERROR, f"Incompatible type for {oper} operation"
+                            )
+                        if bool(left.value()) == short_circuit_on:
+                            stack.append(bool_value(short_circuit_on))
+                            pc = end
+                        continue
+                    elif op == Opcode.CHECK_BOOL:
+                        if stack[-1].type() != Type.BOOL:
+                            interp.error(
+                                ErrorType.TYPE_ERROR, f"Incompatible type for {arg} operation"
+                            )
+                        continue
+                    elif op == Opcode.DEFINE_VAR:
+                        env.create(VirtualMachine.NIL_VALUE)
+                        continue
+                    elif op == Opcode.RETURN_VALUE:
+                        status, result = ExecStatus.RETURN, copy.copy(stack.pop())
+                    elif op == Opcode.END_THUNK:
+                        status, result = ExecStatus.CONTINUE, stack.pop()
+                        if thunk is not None:
+                            if not result.evaluated():
+                                # the lazy value a tail call returned: a copy no one else
+                                # holds, so it runs in this frame's place and thunk still
+                                # takes the result
+                                env.pop_func()
+                                env.push_func(result.env())
+                                ops = result.ast().ops
+                                args = result.ast().args
+                                pc = 0
+                                continue
+                            thunk.set_type_value(result.type(), result.value())
+                    elif op == Opcode.END_FUNC:
+                        status, result = ExecStatus.CONTINUE, VirtualMachine.NIL_VALUE
+                    elif op == Opcode.RETURN_NIL:
+                        status, result = ExecStatus.RETURN, VirtualMachine.NIL_VALUE
+                    elif op == Opcode.PRINT_ARG:
+                        value_obj = stack.pop()
+                        stack[-1] = stack[-1] + get_printable(value_obj)
+                        continue
+                    elif op == Opcode.CALL_PRINT:
+                        interp.output(stack[-1])
+                        stack[-1] = VirtualMachine.NIL_VALUE
+                        continue
+                    elif op == Opcode.CALL_INPUT:
+                        stack.append(self.__input(stack, *arg))
+                        continue
+                    elif op == Opcode.SETUP_TRY:
+                        handlers.append((arg, depth, len(stack)))
+                        continue
+                    elif op == Opcode.POP_TRY:
+                        handlers.pop()
+                        continue
+                    elif op == Opcode.MATCH_EXCEPTION:
+                        if stack[-1].value() != arg[0]:
+                            pc = arg[1]
+                        continue
+                    elif op == Opcode.RAISE:
+                        exception_type = stack.pop()
+                        value_obj = copy.copy(exception_type)
+                        if exception_type.type() != Type.STRING:
+                            interp.error(
+                                ErrorType.TYPE_ERROR,
+                                f"Invalid type for raise argument: {value_obj.type()}",
+                            )
+                        raise BrewinRaise(value_obj)
+                    elif op == Opcode.RERAISE:
+                        raise BrewinRaise(stack.pop())
+                    elif op == Opcode.LOAD_SHARED:
+                        stack.append(env.get(*arg))
+                        continue
+                    elif op == Opcode.STEP:
+                        limits.countdown -= 1
+                        if not limits.countdown:
+                            limits.check()
+                        continue
+                    elif op == Opcode.TRACE:
+                        print(arg)
+                        continue
+                    elif op == Opcode.NAME_ERROR:
+                        interp.error(ErrorType.NAME_ERROR, arg)
+                        continue
+                    else:
+                        continue
+
+                    if op == Opcode.LOAD_VAR or op == Opcode.FORCE:
+                        # evaluate the lazy value val in a frame of its own
+                        if len(frames) >= max_depth:
+                            self.__overflow()
+                        frames.append((ops, args, stack, handlers, depth, pc, thunk))
+                        env.push_func(env_to_eval)
+                        ops = callee.ops
+                        args = callee.args
+                        stack = []
+                        handlers = []
+                        depth = 0
+                        pc = 0
+                        thunk = val
+                        continue
+
+                    # the running frame finished with result; resume its caller
+                    if not frames:
+                        return (status, result)
+                    env.pop_func()
+                    ops, args, stack, handlers, depth, pc, thunk = frames.pop()
+                    stack.append(result)
+            except BrewinRaise as exc:
+                # unwind to the innermost handler, discarding frames that have none; a lazy
+                # value whose evaluation raised stays unevaluated
+                while not handlers:
+                    if not frames:
+                        return (ExecStatus.EXCEPTION, exc.value)
+                    env.pop_func()
+                    ops, args, stack, handlers, depth, pc, thunk = frames.pop()
+                pc, handler_depth, stack_depth = handlers.pop()
+                while depth > handler_depth:
+                    env.pop_block()
+                    depth -= 1
+                del stack[stack_depth:]
+                stack.append(exc.value)
+
+    def __overflow(self):
+        self.interp.error(
+            ErrorType.FAULT_ERROR,
+            f"Stack overflow: more than {self.max_depth} nested calls and lazy evaluations",
+        )
+
+    def __input(self, stack, func_name, num_args):
+        interp = self.interp
+        if num_args == 1:
+            interp.output(get_printable(stack.pop()))
+        elif num_args > 1:
+            interp.error(ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter")
+        if func_name == "inputi":
+            return int_value(interp.get_input_int())
+        return Value(Type.STRING, interp.get_input())
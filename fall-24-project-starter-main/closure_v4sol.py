@@ -0,0 +1,583 @@
+import copy
+
+from env_v4sol import EnvironmentManager
+from intbase import InterpreterBase, ErrorType
+from resolver_v4sol import bind_params
+from strictness_v4sol import speculate
+from type_valuev4sol import (
+    ExecStatus, Type, Value, LazyValue, bool_value, create_value, get_printable, int_value,
+    make_value,
+)
+
+# Alternative execution engine for interpreterv4sol: every node of the AST is compiled once
+# into a Python closure with its operands already bound, so running a node is a single call
+# instead of a walk through the elem_type if/elif chains and node field lookups.
+# Closures return the same (ExecStatus, value) pairs as the tree walker, and lazy values hold
+# the compiled eager closure of their expression in place of the AST node.
+
+
+# a user-defined function; the body is filled in once every function has been declared
+class CompiledFunction:
+    def __init__(self, name, param_slots):
+        self.name = name
+        self.param_slots = param_slots
+        self.body = None
+
+
+class ClosureCompiler:
+    NIL_VALUE = create_value(InterpreterBase.NIL_DEF)
+    DIV_ZERO = Value(Type.STRING, "div0")
+    BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+
+    # interp is the Interpreter used for output, input, errors and its op_to_lambda table
+    def __init__(self, interp):
+        self.interp = interp
+        self.env = EnvironmentManager()
+
+    # compile the whole program (already annotated by resolver_v4sol), returning a closure that
+    # runs main()
+    def compile(self, ast):
+        # as in the tree walker, a later definition with the same name and arity wins
+        func_defs = {}
+        for func_def in ast.functions:
+            func_defs[(func_def.name, len(func_def.args))] = func_def
+        self.func_table = {}
+        for (func_name, num_params), func_def in func_defs.items():
+            if func_name not in self.func_table:
+                self.func_table[func_name] = {}
+            self.func_table[func_name][num_params] = CompiledFunction(
+                func_name, func_def.param_slots
+            )
+        for (func_name, num_params), func_def in func_defs.items():
+            func = self.func_table[func_name][num_params]
+            func.body = self.__compile_block(func_def.statements)
+        return self.__compile_user_call("main", [])
+
+    def __compile_block(self, statements):
+        env = self.env
+        compiled = [self.__compile_statement(statement) for statement in statements]
+        if self.interp.trace_output:
+            compiled = [
+                self.__traced(statement, run)
+                for statement, run in zip(statements, compiled)
+            ]
+        if self.interp.limits is not None:
+            compiled = [self.__counted(run) for run in compiled]
+        done = (ExecStatus.CONTINUE, ClosureCompiler.NIL_VALUE)
+
+        def run_block():
+            env.push_block()
+            for run in compiled:
+                result = run()
+                if result[0] is not ExecStatus.CONTINUE:
+                    env.pop_block()
+                    return result
+            env.pop_block()
+            return done
+
+        return run_block
+
+    def __traced(self, statement, run):
+        def run_traced():
+            print(statement)
+            return run()
+
+        return run_traced
+
+    # counts a step against the interpreter's resource limits before running the statement
+    def __counted(self, run):
+        limits = self.interp.limits
+
+        def run_counted():
+            limits.countdown -= 1
+            if not limits.countdown:
+                limits.check()
+            return run()
+
+        return run_counted
+
+    def __compile_statement(self, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.FCALL_NODE:
+            return self.__compile_call(statement)
+        if kind == "=":
+            return self.__compile_assign(statement)
+        if kind == InterpreterBase.VAR_DEF_NODE:
+            return self.__compile_var_def(statement)
+        if kind == InterpreterBase.RETURN_NODE:
+            return self.__compile_return(statement)
+        if kind == InterpreterBase.RAISE_NODE:
+            return self.__compile_raise(statement)
+        if kind == InterpreterBase.IF_NODE:
+            return self.__compile_if(statement)
+        if kind == InterpreterBase.FOR_NODE:
+            return self.__compile_for(statement)
+        if kind == InterpreterBase.TRY_NODE:
+            return self.__compile_try(statement)
+        # bare expressions other than calls are never evaluated
+        nothing = (ExecStatus.CONTINUE, None)
+        return lambda: nothing
+
+    def __compile_assign(self, assign_ast):
+        env = self.env
+        error = self.interp.error
+        var_name = assign_ast.name
+        expr = self.__compile_expr(assign_ast.expression, assign_ast.strict)
+        if assign_ast.addr is None:
+
+            def run_undefined():
+                result = expr()
+                if result[0] is ExecStatus.EXCEPTION:
+                    return result
+                error(ErrorType.NAME_ERROR, f"Undefined variable {var_name} in assignment")
+
+            return run_undefined
+        depth, slot = assign_ast.addr
+
+        def run_assign():
+            result = expr()
+            if result[0] is ExecStatus.EXCEPTION:
+                return result
+            env.set(depth, slot, result[1])
+            return result
+
+        return run_assign
+
+    def __compile_var_def(self, var_ast):
+        env = self.env
+        error = self.interp.error
+        var_name = var_ast.name
+        nil = ClosureCompiler.NIL_VALUE
+        done = (ExecStatus.CONTINUE, None)
+        if var_ast.addr is None:
+
+            def run_duplicate():
+                error(ErrorType.NAME_ERROR, f"Duplicate definition for variable {var_name}")
+
+            return run_duplicate
+
+        def run_var_def():
+            env.create(nil)
+            return done
+
+        return run_var_def
+
+    def __compile_return(self, return_ast):
+        expr_ast = return_ast.expression
+        if expr_ast is None:
+            done = (ExecStatus.RETURN, ClosureCompiler.NIL_VALUE)
+            return lambda: done
+        if expr_ast.elem_type == InterpreterBase.VAR_NODE:
+            # a shared lazy value is returned behind a new one (see Interpreter.__do_return)
+            expr = self.__compile_lazy(expr_ast)
+        else:
+            expr = self.__compile_expr(expr_ast, False)
+
+        def run_return():
+            status, ret_val = expr()
+            if status is ExecStatus.EXCEPTION:
+                return (status, ret_val)
+            return (ExecStatus.RETURN, copy.copy(ret_val))
+
+        return run_return
+
+    def __compile_raise(self, raise_ast):
+        error = self.interp.error
+        expr = self.__compile_expr(raise_ast.exception_type, True)
+
+        def run_raise():
+            _, exception_type = expr()
+            value_obj = copy.copy(exception_type)
+            if exception_type.type() != Type.STRING:
+                error(
+                    ErrorType.TYPE_ERROR,
+                    f"Invalid type for raise argument: {value_obj.type()}",
+                )
+            return (ExecStatus.EXCEPTION, value_obj)
+
+        return run_raise
+
+    def __compile_if(self, if_ast):
+        error = self.interp.error
+        cond = self.__compile_expr(if_ast.condition, True)
+        then_block = self.__compile_block(if_ast.statements)
+        else_statements = if_ast.else_statements
+        else_block = None
+        if else_statements is not None:
+            else_block = self.__compile_block(else_statements)
+        done = (ExecStatus.CONTINUE, ClosureCompiler.NIL_VALUE)
+
+        def run_if():
+            status, result = cond()
+            if status is ExecStatus.EXCEPTION:
+                return (status, result)
+            if result.type() != Type.BOOL:
+                error(ErrorType.TYPE_ERROR, "Incompatible type for if condition")
+            if result.value():
+                return then_block()
+            if else_block is not None:
+                return else_block()
+            return done
+
+        return run_if
+
+    def __compile_for(self, for_ast):
+        error = self.interp.error
+        init = self.__compile_statement(for_ast.init)
+        cond = self.__compile_expr(for_ast.condition, True)
+        update = self.__compile_statement(for_ast.update)
+        body = self.__compile_block(for_ast.statements)
+        done = (ExecStatus.CONTINUE, ClosureCompiler.NIL_VALUE)
+
+        def run_for():
+            result = init()  # only a strict init or update (see strictness_v4sol.py) can raise
+            if result[0] is ExecStatus.EXCEPTION:
+                return result
+            while True:
+                status, run_for = cond()
+                if status is ExecStatus.EXCEPTION:
+                    return (status, run_for)
+                if run_for.type() != Type.BOOL:
+                    error(ErrorType.TYPE_ERROR, "Incompatible type for for condition")
+                if not run_for.value():
+                    return done
+                result = body()
+                if result[0] is not ExecStatus.CONTINUE:
+                    return result
+                result = update()
+                if result[0] is ExecStatus.EXCEPTION:
+                    return result
+
+        return run_for
+
+    def __compile_try(self, try_ast):
+        body = self.__compile_block(try_ast.statements)
+        catchers = [
+            (catcher.exception_type, self.__compile_block(catcher.statements))
+            for catcher in try_ast.catchers
+        ]
+
+        def run_try():
+            result = body()
+            if result[0] is not ExecStatus.EXCEPTION:
+                return result
+            exception_value = result[1].value()
+            for exception_type, handler in catchers:
+                if exception_value == exception_type:
+                    return handler()
+            return result
+
+        return run_try
+
+    # compile a call used as a statement or as an expression; a RETURN status is turned into CONTINUE
+    def __compile_call(self, call_node):
+        func_name = call_node.name
+        actual_args = call_node.args
+        if func_name == "print":
+            return self.__compile_print(actual_args)
+        if func_name == "inputi" or func_name == "inputs":
+            return self.__compile_input(func_name, actual_args)
+        call = self.__compile_user_call(func_name, actual_args)
+
+        def run_call():
+            result = call()
+            if result[0] is ExecStatus.RETURN:
+                return (ExecStatus.CONTINUE, result[1])
+            return result
+
+        return run_call
+
+    # the callee is bound here, but a missing function is only reported when the call runs
+    def __compile_user_call(self, func_name, actual_args):
+        env = self.env
+        error = self.interp.error
+        num_args = len(actual_args)
+        func = None
+        if func_name in self.func_table:
+            func = self.func_table[func_name].get(num_args)
+        if func is None:
+            if func_name not in self.func_table:
+                message = f"Function {func_name} not found"
+            else:
+                message = f"Function {func_name} taking {num_args} params not found"
+
+            def run_missing():
+                error(ErrorType.NAME_ERROR, message)
+
+            return run_missing
+
+        args = [self.__compile_expr(actual_ast, False) for actual_ast in actual_args]
+
+        def run_user_call():
+            values = []
+            for arg in args:
+                status, actual_arg = arg()
+                if status is ExecStatus.EXCEPTION:
+                    return (status, actual_arg)
+                values.append(actual_arg)  # shared with the callee, not copied
+            env.push_func([bind_params(func.param_slots, values)])
+            result = func.body()
+            env.pop_func()
+            return result
+
+        return run_user_call
+
+    def __compile_print(self, actual_args):
+        output = self.interp.output
+        args = [self.__compile_expr(arg, True) for arg in actual_args]
+        done = (ExecStatus.CONTINUE, ClosureCompiler.NIL_VALUE)
+
+        def run_print():
+            text = ""
+            for arg in args:
+                status, result = arg()
+                if status is ExecStatus.EXCEPTION:
+                    return (status, result)
+                text = text + get_printable(result)
+            output(text)
+            return done
+
+        return run_print
+
+    def __compile_input(self, func_name, actual_args):
+        interp = self.interp
+        prompt = None
+        if len(actual_args) == 1:
+            prompt = self.__compile_expr(actual_args[0], True)
+        too_many = len(actual_args) > 1
+        value_type = Type.INT if func_name == "inputi" else Type.STRING
+
+        def run_input():
+            if prompt is not None:
+                status, result = prompt()
+                if status is ExecStatus.EXCEPTION:
+                    return (status, result)
+                interp.output(get_printable(result))
+            elif too_many:
+                interp.error(
+                    ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter"
+                )
+            if value_type == Type.INT:
+                return (ExecStatus.CONTINUE, int_value(interp.get_input_int()))
+            return (ExecStatus.CONTINUE, Value(Type.STRING, interp.get_input()))
+
+        return run_input
+
+    # compile an expression; when eager is False, a variable gives its value as it is (shared) and
+    # anything else but a literal produces a LazyValue
+    def __compile_expr(self, expr_ast, eager):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.NIL_NODE:
+            result = (ExecStatus.CONTINUE, ClosureCompiler.NIL_VALUE)
+            return lambda: result
+        if kind == InterpreterBase.INT_NODE:
+            result = (ExecStatus.CONTINUE, int_value(expr_ast.val))
+            return lambda: result
+        if kind == InterpreterBase.STRING_NODE:
+            result = (ExecStatus.CONTINUE, Value(Type.STRING, expr_ast.val))
+            return lambda: result
+        if kind == InterpreterBase.BOOL_NODE:
+            result = (ExecStatus.CONTINUE, bool_value(expr_ast.val))
+            return lambda: result
+
+        if not eager:
+            if kind == InterpreterBase.VAR_NODE and expr_ast.addr is not None:
+                return self.__compile_shared(expr_ast)
+            return self.__compile_lazy(expr_ast)
+
+        if kind == InterpreterBase.VAR_NODE:
+            return self.__compile_var(expr_ast)
+        if kind == InterpreterBase.FCALL_NODE:
+            call = self.__compile_call(expr_ast)
+            force = self.__force
+
+            def run_fcall():
+                status, result = call()
+                if status is ExecStatus.EXCEPTION:
+                    return (status, result)
+                if result.evaluated():
+                    return (ExecStatus.CONTINUE, result)
+                return force(result)
+
+            return run_fcall
+        if kind in ClosureCompiler.BIN_OPS:
+            if kind == "||" or kind == "&&":
+                return self.__compile_logical(expr_ast)
+            return self.__compile_op(expr_ast)
+        if kind == InterpreterBase.NEG_NODE:
+            return self.__compile_unary(expr_ast, Type.INT, lambda x: -1 * x)
+        if kind == InterpreterBase.NOT_NODE:
+            return self.__compile_unary(expr_ast, Type.BOOL, lambda x: not x)
+        return lambda: None
+
+    # a LazyValue of the expression, or its value when speculate() can tell it now
+    def __compile_lazy(self, expr_ast):
+        env = self.env
+        if expr_ast.elem_type == InterpreterBase.FCALL_NODE:
+            # a tail call: __force forces the lazy value it returns once its frame is gone
+            forced = self.__compile_call(expr_ast)
+        else:
+            forced = self.__compile_expr(expr_ast, True)
+        # a lazy value holds forced in place of the AST, so the variable it forces first
+        # (see strictness_v4sol.py) goes along with it
+        forced.first = expr_ast.first
+        free = expr_ast.free
+        if not expr_ast.pure:
+            return lambda: (ExecStatus.CONTINUE, LazyValue(forced, env.capture(free)))
+        ops = self.interp.op_to_lambda
+
+        # no need for a LazyValue if it can be evaluated without effects
+        def run_pure():
+            value = speculate(expr_ast, env, ops)
+            if value is None:
+                value = LazyValue(forced, env.capture(free))
+            return (ExecStatus.CONTINUE, value)
+
+        return run_pure
+
+    # a variable in a lazy position: its value, evaluated or not, so that every alias of a lazy
+    # value shares its result (see Interpreter.__eval_expr)
+    def __compile_shared(self, var_ast):
+        env = self.env
+        depth, slot = var_ast.addr
+
+        def run_shared():
+            return (ExecStatus.CONTINUE, env.get(depth, slot))
+
+        return run_shared
+
+    def __compile_var(self, var_ast):
+        env = self.env
+        error = self.interp.error
+        force = self.__force
+        var_name = var_ast.name
+        if var_ast.addr is None:
+
+            def run_undefined():
+                error(ErrorType.NAME_ERROR, f"Variable {var_name} not found")
+
+            return run_undefined
+        depth, slot = var_ast.addr
+
+        def run_var():
+            val = env.get(depth, slot)
+            if val.evaluated():
+                return (ExecStatus.CONTINUE, val)
+            return force(val)
+
+        return run_var
+
+    # evaluate a lazy value in the environment it captured and cache the result.  The closure
+    # of a lazy function call leaves the value the function returns unforced; when that is a
+    # lazy value, this loop forces it next, with the call's frame already gone, so a chain of
+    # tail calls runs in constant space.  It is a copy no one else holds, so only val caches.
+    def __force(self, val):
+        target = val
+        while True:
+            dependency = self.__force_dependencies(val)
+            if dependency is not None:
+                return dependency
+            self.env.push_func(val.env())
+            status, evaluated_val = val.ast()()
+            self.env.pop_func()
+            if status is ExecStatus.EXCEPTION or evaluated_val.evaluated():
+                break
+            val = evaluated_val
+        if status is not ExecStatus.EXCEPTION:
+            target.set_type_value(evaluated_val.type(), evaluated_val.value())
+            status = ExecStatus.CONTINUE
+        return (status, evaluated_val)
+
+    # force the chain of lazy values val forces first, deepest first, so that it is forced by
+    # this loop rather than by recursion (see Interpreter.__force_dependencies); returns the
+    # (status, value) of an exception one of them raised, or None
+    def __force_dependencies(self, val):
+        chain = []
+        var_ast = val.ast().first
+        while var_ast is not None and var_ast.addr is not None:
+            depth, slot = var_ast.addr
+            val = val.env()[depth][slot]
+            if val.evaluated():
+                break
+            chain.append(val)
+            var_ast = val.ast().first
+        for dependency in reversed(chain):
+            status, result = self.__force(dependency)
+            if status is ExecStatus.EXCEPTION:
+                return (status, result)
+        return None
+
+    def __compile_op(self, arith_ast):
+        error = self.interp.error
+        oper = arith_ast.elem_type
+        op1 = self.__compile_expr(arith_ast.op1, True)
+        op2 = self.__compile_expr(arith_ast.op2, True)
+        any_types = oper == "==" or oper == "!="
+        # operator implementations for each left operand type, None if unsupported
+        impls = {
+            t: ops.get(oper) for t, ops in self.interp.op_to_lambda.items()
+        }
+        div_zero = (ExecStatus.EXCEPTION, ClosureCompiler.DIV_ZERO)
+        is_div = oper == "/"
+
+        def run_op():
+            left_status, left = op1()
+            if left_status is ExecStatus.EXCEPTION:
+                return (left_status, left)
+            right_status, right = op2()
+            if right_status is ExecStatus.EXCEPTION:
+                return (right_status, right)
+            left_type = left.type()
+            if not any_types and left_type != right.type():
+                error(ErrorType.TYPE_ERROR, f"Incompatible types for {oper} operation")
+            f = impls.get(left_type)
+            if f is None:
+                error(
+                    ErrorType.TYPE_ERROR,
+                    f"Incompatible operator {oper} for type {left_type}",
+                )
+            if is_div and right.value() == 0:
+                return div_zero
+            return (ExecStatus.CONTINUE, f(left, right))
+
+        return run_op
+
+    def __compile_logical(self, arith_ast):
+        error = self.interp.error
+        oper = arith_ast.elem_type
+        op1 = self.__compile_expr(arith_ast.op1, True)
+        op2 = self.__compile_expr(arith_ast.op2, True)
+        # the value of the left operand that decides the result without evaluating the right one
+        short_circuit_on = oper == "||"
+
+        def run_logical():
+            left_status, left = op1()
+            if left_status is ExecStatus.EXCEPTION:
+                return (left_status, left)
+            if left.type() != Type.BOOL:
+                error(ErrorType.TYPE_ERROR, f"Incompatible type for {oper} operation")
+            if bool(left.value()) == short_circuit_on:
+                return (ExecStatus.CONTINUE, bool_value(short_circuit_on))
+            right_status, right = op2()
+            if right_status is ExecStatus.EXCEPTION:
+                return (right_status, right)
+            if right.type() != Type.BOOL:
+                error(ErrorType.TYPE_ERROR, f"Incompatible type for {oper} operation")
+            return (ExecStatus.CONTINUE, right)
+
+        return run_logical
+
+    def __compile_unary(self, arith_ast, t, f):
+        error = self.interp.error
+        oper = arith_ast.elem_type
+        op1 = self.__compile_expr(arith_ast.op1, True)
+
+        def run_unary():
+            status, value_obj = op1()
+            if status is ExecStatus.EXCEPTION:
+                return (status, value_obj)
+            if value_obj.type() != t:
+                error(ErrorType.TYPE_ERROR, f"Incompatible type for {oper} operation")
+            return (ExecStatus.CONTINUE, make_value(t, f(value_obj.value())))
+
+        return run_unary
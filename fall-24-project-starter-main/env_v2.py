@@ -21,6 +21,13 @@ Updated way:
     block_stack: tracking inner scopes within a function (tackles if/for scope blocks) --> do so by popping/appending dictionaries to the stack
 - Basically adding a new scope (dictionary) for new function calls
 - main() is the outermost/top level/"global" scope 
+
+Frame stack:
+- push_function_scope used to copy the whole block_stack and keep the caller's dicts in it, so each call cost
+  more the deeper the recursion and a callee could see its callers' variables
+- now each function call gets its own block_stack (its frame): the caller's block_stack is saved as is on
+  function_stack and a fresh one started, so entering/leaving a function is O(1)
+- get/set only walk the callee's blocks, then the top level scope
 '''
 
 class EnvironmentManager:
@@ -31,12 +38,8 @@ class EnvironmentManager:
 
     
     def push_function_scope(self):
-        self.function_stack.append(list(self.block_stack)) #save copy of block stack for isolation
-        self.block_stack.append({}) #add new scope for  a new function call! 
-        #save the current block stack as a separate, isolated scope
-        #self.function_stack.append(self.block_stack.copy())  # Ensures isolation
-        #initialize a new isolated block stack for the new function call
-        #self.block_stack = [{}]
+        self.function_stack.append(self.block_stack) #save caller's block stack (no copy)
+        self.block_stack = [{}] #new frame: the function call only sees its own scopes
 
 
     def pop_function_scope(self):
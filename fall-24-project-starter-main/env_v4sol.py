@@ -1,92 +1,91 @@
-import copy
-
 import type_valuev4sol
 
-# The EnvironmentManager class keeps a mapping between each variable name (aka symbol)
-# in a brewin program and the Value object, which stores a type, and a value.
+# One function activation: a list of blocks, each block a list of slots.  Lazy values do not
+# hold on to a frame's blocks; they copy out just the variables they read (see capture), so a
+# frame is only ever changed by the function it belongs to.
+class Frame:
+    def __init__(self, blocks):
+        self.blocks = blocks
+
+
+# The EnvironmentManager class keeps the Value object of each variable in a brewin program.
+# Each function activation is a Frame; variables are addressed by the (depth, slot) pair that
+# resolver_v4sol.py assigns to them, so reads and writes are O(1) instead of a walk over the
+# block scopes.
 class EnvironmentManager:
     def __init__(self):
         self.environment = []
+        self.frame = None  # the top-most frame
 
-    # returns a VariableDef object
-    def get(self, symbol):
-        cur_func_env = self.environment[-1]
-        for env in reversed(cur_func_env):
-            if symbol in env:
-                return env[symbol]
+    # returns the Value object of the variable at the given address
+    def get(self, depth, slot):
+        return self.frame.blocks[depth][slot]
 
-        return None
+    def set(self, depth, slot, value):
+        self.frame.blocks[depth][slot] = value
 
-    def set(self, symbol, value):
-        cur_func_env = self.environment[-1]
-        for env in reversed(cur_func_env):
-            if symbol in env:
-                env[symbol] = value
-                return True
+    # create a new variable in the top-most block; definitions run in the order the resolver
+    # numbered them, so it lands in its slot
+    def create(self, value):
+        self.frame.blocks[-1].append(value)
 
-        return False
-
-    # create a new symbol in the top-most environment, regardless of whether that symbol exists
-    # in a lower environment
-    def create(self, symbol, value):
-        cur_func_env = self.environment[-1]
-        if symbol in cur_func_env[-1]:   # symbol already defined in current scope
-            return False
-        cur_func_env[-1][symbol] = value
-        return True
-
-    # used when we enter a new function - start with empty dictionary to hold parameters.
+    # used when we enter a new function - start with the block holding its parameters.
+    # the environment a lazy value captured is pushed as is to evaluate the value in it; an
+    # expression only reads its variables, so that environment is never changed
     def push_func(self, func_env = None):
         if func_env is None:
-            self.environment.append([{}])  # [[...]] -> [[...], [{}]]
-        else:
-            self.environment.append(func_env) # used for lazy evaluation
+            func_env = [[]]
+        self.frame = Frame(func_env)
+        self.environment.append(self.frame)
 
     def push_block(self):
-        cur_func_env = self.environment[-1]
-        cur_func_env.append({})  # [[...],[{....}] -> [[...],[{...}, {}]]
+        self.frame.blocks.append([])
 
     def pop_block(self):
-        cur_func_env = self.environment[-1]
-        cur_func_env.pop() 
+        self.frame.blocks.pop()
 
-    # used when we exit a nested block to discard the environment for that block
+    # used when we exit a function or a lazy evaluation to discard its frame
     def pop_func(self):
         self.environment.pop()
+        self.frame = self.environment[-1] if self.environment else None
 
-    # return a new environment that only includes the top function's environment/in-scope variables
-    def get_top_env(self):
-        c = self.__env_copy(self.environment[-1])
-        #print("ENV: ")
-        #self.print_env(c)
-        return c
+    # return just the variables an expression reads (its `free` annotation, see
+    # resolver_v4sol.py) as an environment to evaluate it in later: blocks it does not read are
+    # None and the others map slot -> Value, so get() works on it as on a frame's blocks.  A
+    # lazy value holds this rather than the frame's blocks, so what it keeps alive and the time taken
+    # to capture it depend on the expression, not on the size of the scope
+    def capture(self, free):
+        size, used = free
+        blocks = self.frame.blocks
+        env = [None] * size
+        for depth, slots in used:
+            block = blocks[depth]
+            captured = {}
+            for slot in slots:
+                captured[slot] = block[slot]
+            env[depth] = captured
+        return env
 
-    def __env_copy(self, top_level_env):
-        new_env = []
-        for d in top_level_env:
-            new_env.append(d.copy())
-        return new_env
-    
     # write a function to recursively print the environment
     def print_env(self, env):
         def print_recursive(obj, indent=""):
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    print(f"{indent}{key}:")
-                    print_recursive(value, indent + "  ")
-            elif isinstance(obj, list):
-                for item in obj:
+            if isinstance(obj, list):
+                for slot, item in enumerate(obj):
+                    print(f"{indent}{slot}:")
+                    print_recursive(item, indent + "  ")
+            elif isinstance(obj, dict):
+                for slot, item in obj.items():
+                    print(f"{indent}{slot}:")
                     print_recursive(item, indent + "  ")
-            elif isinstance(obj, type_valuev4.LazyValue):
+            elif isinstance(obj, type_valuev4sol.LazyValue):
                 print(f"{indent}LazyValue: ")    
                 print_recursive(obj.top_env, indent + "  ")
-            elif isinstance(obj, type_valuev4.Value):
+            elif isinstance(obj, type_valuev4sol.Value):
                 print(f"{indent}{obj.type()}: {obj.value()}")
             else:
                 print(f"---{indent}{obj}")
 
-        for e in env:
-            for k, v in e.items():
-                print(f"{k}:")
-                print_recursive(v, "  ")
+        for depth, block in enumerate(env):
+            print(f"block {depth}:")
+            print_recursive(block, "  ")
         
\ No newline at end of file
@@ -0,0 +1,197 @@
+from brewast import BoolLit, IntLit, Node, StringLit
+from intbase import InterpreterBase
+from type_valuev4sol import Type, Value
+
+# Static pass run on the AST right after parsing, before resolver_v4sol.  It rewrites the tree
+# in place:
+#  - operators whose operands are all literals are replaced by the literal they evaluate to,
+#    using the interpreter's own op_to_lambda table.  Operations that would raise or fail at
+#    run time (`/ 0`, mismatched types, `-"a"`, ...) are left alone, so they still do so when
+#    (and only if) they run.  `true || e` and `false && e` fold even when e is not a literal,
+#    as e is never evaluated.
+#  - an if with a literal bool condition is replaced by the branch that runs.  The branch is
+#    spliced into the enclosing block when it defines no variables of its own, otherwise it is
+#    kept as `if (true) {...}` so its variables stay in their own block.
+#  - a for with a literal false condition is replaced by its init assignment.
+#  - statements after a return or raise in the same block are dropped.
+# stats() reports what the last fold_program call did: the expressions it replaced by a literal
+# (folded), the statements it dropped or if/for statements it resolved (pruned) and the number
+# of nodes that left the tree (removed).  Interpreter.fold_stats keeps it for each run.
+
+
+class ConstantFolder:
+    LITERAL_NODES = {
+        InterpreterBase.INT_NODE,
+        InterpreterBase.STRING_NODE,
+        InterpreterBase.BOOL_NODE,
+        InterpreterBase.NIL_NODE,
+    }
+    ARITH_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<="}
+    LOGICAL_OPS = {"&&", "||"}
+    TYPE_TO_NODE = {
+        Type.INT: IntLit,
+        Type.STRING: StringLit,
+        Type.BOOL: BoolLit,
+    }
+
+    def __init__(self, op_to_lambda):
+        self.op_to_lambda = op_to_lambda
+        self.folded = 0
+        self.pruned = 0
+        self.removed = 0
+
+    def fold_program(self, ast):
+        self.folded = 0
+        self.pruned = 0
+        before = self.__count(ast)
+        for func_def in ast.functions:
+            func_def.statements = self.__fold_block(func_def.statements)
+        self.removed = before - self.__count(ast)
+        return ast
+
+    def stats(self):
+        return {"folded": self.folded, "pruned": self.pruned, "removed": self.removed}
+
+    def __fold_block(self, statements):
+        folded = []
+        for i, statement in enumerate(statements):
+            folded.extend(self.__fold_statement(statement))
+            if statement.elem_type in (InterpreterBase.RETURN_NODE, InterpreterBase.RAISE_NODE):
+                self.pruned += len(statements) - i - 1  # the rest of the block can never run
+                break
+        return folded
+
+    # returns the statements that replace statement in its block
+    def __fold_statement(self, statement):
+        kind = statement.elem_type
+        if kind == "=":
+            statement.expression = self.__fold_expr(statement.expression)
+        elif kind == InterpreterBase.RETURN_NODE:
+            if statement.expression is not None:
+                statement.expression = self.__fold_expr(statement.expression)
+        elif kind == InterpreterBase.RAISE_NODE:
+            statement.exception_type = self.__fold_expr(statement.exception_type)
+        elif kind == InterpreterBase.IF_NODE:
+            return self.__fold_if(statement)
+        elif kind == InterpreterBase.FOR_NODE:
+            return self.__fold_for(statement)
+        elif kind == InterpreterBase.TRY_NODE:
+            statement.statements = self.__fold_block(statement.statements)
+            for catcher in statement.catchers:
+                catcher.statements = self.__fold_block(catcher.statements)
+        elif kind == InterpreterBase.FCALL_NODE:
+            statement.args = [self.__fold_expr(arg) for arg in statement.args]
+        return [statement]
+
+    def __fold_if(self, if_ast):
+        cond = self.__fold_expr(if_ast.condition)
+        if_ast.condition = cond
+        if_ast.statements = self.__fold_block(if_ast.statements)
+        if if_ast.else_statements is not None:
+            if_ast.else_statements = self.__fold_block(if_ast.else_statements)
+        if cond.elem_type != InterpreterBase.BOOL_NODE:
+            return [if_ast]
+
+        self.pruned += 1
+        branch = if_ast.statements if cond.val else if_ast.else_statements
+        if branch is None:
+            return []
+        if all(s.elem_type != InterpreterBase.VAR_DEF_NODE for s in branch):
+            return branch
+        if_ast.condition = BoolLit(True)
+        if_ast.statements = branch
+        if_ast.else_statements = None
+        return [if_ast]
+
+    def __fold_for(self, for_ast):
+        self.__fold_statement(for_ast.init)
+        cond = self.__fold_expr(for_ast.condition)
+        if cond.elem_type == InterpreterBase.BOOL_NODE and not cond.val:
+            self.pruned += 1
+            return [for_ast.init]
+        for_ast.condition = cond
+        self.__fold_statement(for_ast.update)
+        for_ast.statements = self.__fold_block(for_ast.statements)
+        return [for_ast]
+
+    # returns the node that replaces expr_ast
+    def __fold_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.FCALL_NODE:
+            expr_ast.args = [self.__fold_expr(arg) for arg in expr_ast.args]
+            return expr_ast
+        if kind in ConstantFolder.ARITH_OPS:
+            return self.__fold_arith(expr_ast)
+        if kind in ConstantFolder.LOGICAL_OPS:
+            return self.__fold_logical(expr_ast)
+        if kind == InterpreterBase.NEG_NODE or kind == InterpreterBase.NOT_NODE:
+            return self.__fold_unary(expr_ast)
+        return expr_ast
+
+    def __fold_arith(self, expr_ast):
+        kind = expr_ast.elem_type
+        left = self.__fold_expr(expr_ast.op1)
+        right = self.__fold_expr(expr_ast.op2)
+        expr_ast.op1 = left
+        expr_ast.op2 = right
+        if left.elem_type not in ConstantFolder.LITERAL_NODES:
+            return expr_ast
+        if right.elem_type not in ConstantFolder.LITERAL_NODES:
+            return expr_ast
+
+        # same checks as Interpreter.__eval_op; anything it would reject stays as is
+        left_value = self.__to_value(left)
+        right_value = self.__to_value(right)
+        if kind != "==" and kind != "!=" and left_value.type() != right_value.type():
+            return expr_ast
+        f = self.op_to_lambda[left_value.type()].get(kind)
+        if f is None or (kind == "/" and right_value.value() == 0):
+            return expr_ast
+        self.folded += 1
+        return self.__to_literal(f(left_value, right_value))
+
+    def __fold_logical(self, expr_ast):
+        left = self.__fold_expr(expr_ast.op1)
+        right = self.__fold_expr(expr_ast.op2)
+        expr_ast.op1 = left
+        expr_ast.op2 = right
+        if left.elem_type != InterpreterBase.BOOL_NODE:
+            return expr_ast
+        if (expr_ast.elem_type == "||") == left.val:
+            self.folded += 1
+            return left  # short circuit, op2 never runs
+        if right.elem_type != InterpreterBase.BOOL_NODE:
+            return expr_ast
+        self.folded += 1
+        return right
+
+    def __fold_unary(self, expr_ast):
+        operand = self.__fold_expr(expr_ast.op1)
+        expr_ast.op1 = operand
+        if expr_ast.elem_type == InterpreterBase.NEG_NODE:
+            if operand.elem_type == InterpreterBase.INT_NODE:
+                self.folded += 1
+                return IntLit(-1 * operand.val)
+        elif operand.elem_type == InterpreterBase.BOOL_NODE:
+            self.folded += 1
+            return BoolLit(not operand.val)
+        return expr_ast
+
+    def __to_value(self, literal_ast):
+        if literal_ast.elem_type == InterpreterBase.INT_NODE:
+            return Value(Type.INT, literal_ast.val)
+        if literal_ast.elem_type == InterpreterBase.STRING_NODE:
+            return Value(Type.STRING, literal_ast.val)
+        if literal_ast.elem_type == InterpreterBase.BOOL_NODE:
+            return Value(Type.BOOL, literal_ast.val)
+        return Value(Type.NIL, None)
+
+    def __to_literal(self, value):
+        return ConstantFolder.TYPE_TO_NODE[value.type()](value.value())
+
+    def __count(self, node):
+        if isinstance(node, list):
+            return sum(self.__count(item) for item in node)
+        if not isinstance(node, Node):
+            return 0
+        return 1 + sum(self.__count(value) for _, value in node.items())
@@ -6,6 +6,9 @@ class ErrorType(Enum):
     TYPE_ERROR = 1
     NAME_ERROR = 2  # if a variable or function name can't be found
     FAULT_ERROR = 3  # used if an object reference is null and used to make a call
+    STEP_LIMIT_ERROR = 4  # the program ran more statements than allowed (limits_v4sol.py)
+    MEMORY_LIMIT_ERROR = 5  # the program held more allocations than allowed
+    TIMEOUT_ERROR = 6  # the program ran past its wall-clock deadline
     # Add others here
 
 
@@ -40,9 +43,11 @@ class InterpreterBase:
     VOID_DEF = "void"
     
     # methods
-    def __init__(self, console_output=True, inp=None):
+    def __init__(self, console_output=True, inp=None, output_sink=None, input_provider=None):
         self.console_output = console_output
         self.inp = inp  # if not none, then read input from passed-in list
+        self.output_sink = output_sink  # if not none, output goes there instead (see brewio.py)
+        self.input_provider = input_provider  # if not none, input comes from there (brewio.py)
         self.reset()
 
     # Call to reset I/O for another run of the program
@@ -51,12 +56,16 @@ class InterpreterBase:
         self.input_cursor = 0
         self.error_type = None
         self.error_line = None
+        if self.output_sink is not None:
+            self.output_sink.reset()
 
     # Students must implement this in their derived class
     def run(self, program):
         pass
 
     def get_input(self):
+        if self.input_provider is not None:
+            return self.input_provider.next_str()
         if not self.inp:
             return input()  # Get input from keyboard if not input list provided
 
@@ -66,6 +75,12 @@ class InterpreterBase:
             return cur_input
         return None
 
+    # the next input as an int; a provider can parse it without making a str first
+    def get_input_int(self):
+        if self.input_provider is not None:
+            return self.input_provider.next_int()
+        return int(self.get_input())
+
     # students must call this for any errors that they run into
     def error(self, error_type, description=None, line_num=None):
         # log the error before we throw
@@ -81,11 +96,21 @@ class InterpreterBase:
         raise Exception(f"{error_type} on line {line_num}{description}")
 
     def output(self, v):
+        if self.output_sink is not None:
+            self.output_sink.write(v)
+            return
         if self.console_output:
             print(v)
         self.output_log.append(v)
 
+    # write out anything an output sink still holds; every run() calls it in a finally
+    def flush_output(self):
+        if self.output_sink is not None:
+            self.output_sink.flush()
+
     def get_output(self):
+        if self.output_sink is not None:
+            return self.output_sink.lines()
         return self.output_log
 
     def get_error_type_and_line(self):
@@ -15,6 +15,12 @@ class Interpreter (InterpreterBase):
     
     #run() method will be called with a string that represents Brewin program
     def run(self, program):
+        try:
+            self.__run(program)
+        finally:
+            self.flush_output()  # write out what an output sink still holds, even after an error
+
+    def __run(self, program):
         
         #uses the parser to parse the program source code, and then process the nodes of the AST to run the program
         ast = parse_program(program)
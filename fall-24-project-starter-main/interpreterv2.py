@@ -18,10 +18,13 @@ from type_valuev2 import Type, Value, create_value, get_printable
 from intbase import ErrorType, InterpreterBase
 from brewparse import parse_program
 from env_v2 import EnvironmentManager
+from enum import Enum
 
-class ReturnException(Exception):
-    def __init__(self, value=None):
-        self.value = value
+#statements report whether they ran to completion or hit a return, instead of raising an exception
+#for every return (raising/unwinding was most of the cost of a call in recursive programs)
+class ExecStatus(Enum):
+    CONTINUE = 1
+    RETURN = 2
 
 class Interpreter (InterpreterBase):
 
@@ -38,6 +41,12 @@ class Interpreter (InterpreterBase):
 
     #run() method
     def run(self, program):
+        try:
+            self.__run(program)
+        finally:
+            self.flush_output()  # write out what an output sink still holds, even after an error
+
+    def __run(self, program):
         #use parser to parse the program source code, processing nodes of AST to run program
         ast = parse_program(program)
 
@@ -52,9 +61,7 @@ class Interpreter (InterpreterBase):
 
         #run main function statements and handle early termination
         try:
-            self.run_statements(main_function_node.get("statements")) #need to update to handle multifunction
-        except ReturnException:
-            pass #terminate program immediately when return in main
+            self.run_statements(main_function_node.get("statements")) #return in main stops run_statements, terminating the program
         finally:
             self.in_main_scope = False #exit main function, so exit the outermost/top scope then
 
@@ -92,6 +99,7 @@ class Interpreter (InterpreterBase):
     
 
     #going through and running the statements of a single function
+    #returns (ExecStatus.RETURN, value) as soon as a return statement runs, else (ExecStatus.CONTINUE, None)
     def run_statements(self, statements):
         for statement in statements:
             #if variable definition
@@ -107,16 +115,21 @@ class Interpreter (InterpreterBase):
                 self.function_call(statement)
             #new for v2! if statement
             elif statement.elem_type == 'if':
-                self.do_ifstatement(statement)
+                status, value = self.do_ifstatement(statement)
+                if status == ExecStatus.RETURN:
+                    return status, value
             #new for v2! for loop
             elif statement.elem_type == 'for':
-                self.do_forloop(statement)
+                status, value = self.do_forloop(statement)
+                if status == ExecStatus.RETURN:
+                    return status, value
             #new for v2! return statement
             elif statement.elem_type == InterpreterBase.RETURN_NODE:
-                self.do_return(statement)
+                return self.do_return(statement)
             else:
                 #not valid statement
                 super().error(ErrorType.NAME_ERROR, "Not a valid statement",)
+        return ExecStatus.CONTINUE, None
             
 
     
@@ -190,9 +203,6 @@ class Interpreter (InterpreterBase):
         #Update: simplifying the function call handling by: removing redundant checks for inputi, print, and inputs, which should already be handled in function_call
         #and ensuring function_call is invoked with is_expression=True to handle calls within expressions, allowing it to treat return values correctly in those contexts
         elif node_type == InterpreterBase.FCALL_NODE:
-            function_name = node.get('name')
-            args = node.get('args') if 'args' in dir(node) else []
-            
             # Call the function and mark as expression
             return self.function_call(node, is_expression=True)
         
@@ -258,24 +268,24 @@ class Interpreter (InterpreterBase):
         function_info = self.get_function_by_name(function_name, param_count)
         params = function_info['args']
 
+        #evaluate the arguments in the caller's scope, before the callee's frame hides it
+        values = [self.solve_expression(arg) for arg in args]
+
         self.env.push_function_scope() #push new function (works! checked)
 
         #Citation: following code generated by ChatGPT
         #passing by value: bind each param to the evaluated argument value
-        for param, arg in zip(params,args):
-            value = self.solve_expression(arg) #eval the argument
+        for param, value in zip(params,values):
             self.env.create(param.get('name'),value) #store param in the function's environment
         #end of copied code
         self.env.push_block_scope() #push an additional block scope for the function body to allowy shadowing
          
-        try:
-            self.run_statements(function_info["statements"])
-        except ReturnException as e:
-            return e.value #if return encountered, return its value
-        finally:
-            self.env.pop_block_scope()  #remove function body block scope
-            self.env.pop_function_scope()  #remove function scope after function execution
+        status, value = self.run_statements(function_info["statements"])
+        self.env.pop_block_scope()  #remove function body block scope
+        self.env.pop_function_scope()  #remove function scope after function execution
 
+        if status == ExecStatus.RETURN:
+            return value #if return encountered, return its value
         if is_expression:
             return Value(Type.NIL) #if no return statement, return nil value by default #if no return statement, return nil value by default
         #end of copied code
@@ -360,14 +370,14 @@ class Interpreter (InterpreterBase):
         
         #incorporate scope for if statements (can have nested) --> new cope for each if block, else block
         self.env.push_block_scope()
-        try:
-            if condition_result.value():
-                self.run_statements(node.get('statements'))
-            else:
-                if node.get('else_statements') is not None:
-                    self.run_statements(node.get('else_statements'))
-        finally:
-            self.env.pop_block_scope()
+        status, value = ExecStatus.CONTINUE, None
+        if condition_result.value():
+            status, value = self.run_statements(node.get('statements'))
+        else:
+            if node.get('else_statements') is not None:
+                status, value = self.run_statements(node.get('else_statements'))
+        self.env.pop_block_scope()
+        return status, value
             
 
     def do_forloop(self, node):
@@ -402,16 +412,16 @@ class Interpreter (InterpreterBase):
 
 
             if not condition_result.value():
-                break #break out of loop if condition evals to False
+                return ExecStatus.CONTINUE, None #leave loop if condition evals to False
 
 
             #setup new scope for inside for loop
             self.env.push_block_scope()
+            status, value = self.run_statements(node.get('statements'))
             #exit inner block scope after running statements to restore scope
-            try:
-                self.run_statements(node.get('statements'))
-            finally:
-                self.env.pop_block_scope()
+            self.env.pop_block_scope()
+            if status == ExecStatus.RETURN:
+                return status, value #return inside the loop body: skip the update and leave the loop
 
             #do the update! after running statements
             #update maps to an assignment statement
@@ -426,8 +436,8 @@ class Interpreter (InterpreterBase):
         else:
             return_value = Value(Type.NIL)
 
-        #return termination/exception
-        raise ReturnException(return_value)
+        #return termination: run_statements stops and passes this up to function_call
+        return ExecStatus.RETURN, return_value
 
     #carey's setup_ops function: each operation represented by a lambda function that returns new Value object 
     def setup_ops(self):
@@ -12,6 +12,12 @@ class Interpreter(InterpreterBase):
         self.bops = {'+', '-', '*', '/', '==', '!=', '>', '>=', '<', '<=', '||', '&&'}
 
     def run(self, program):
+        try:
+            self.__run(program)
+        finally:
+            self.flush_output()  # write out what an output sink still holds, even after an error
+
+    def __run(self, program):
         ast = parse_program(program)
 
         for func in ast.get('functions'):
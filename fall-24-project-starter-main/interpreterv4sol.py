@@ -1,16 +1,21 @@
 import copy
-from enum import Enum
+import functools
 
 from brewparse import parse_program
+from bytecode_v4sol import BytecodeCompiler, VirtualMachine
+from closure_v4sol import ClosureCompiler
 from env_v4sol import EnvironmentManager
+from folder_v4sol import ConstantFolder
 from intbase import InterpreterBase, ErrorType
-from type_valuev4sol import Type, Value, LazyValue, create_value, get_printable
-
-
-class ExecStatus(Enum):
-    CONTINUE = 1
-    RETURN = 2
-    EXCEPTION = 3
+from limits_v4sol import ResourceLimits
+from memo_v4sol import MemoTable, PurityAnalyzer
+from raising_v4sol import RaisingWalker
+from resolver_v4sol import Resolver, bind_params
+from strictness_v4sol import StrictnessAnalyzer, speculate
+from type_valuev4sol import (
+    BrewinRaise, ExecStatus, Type, Value, LazyValue, bool_value, create_value, get_printable,
+    int_value, make_value,
+)
 
 
 # Main interpreter class
@@ -20,30 +25,109 @@ class Interpreter(InterpreterBase):
     TRUE_VALUE = create_value(InterpreterBase.TRUE_DEF)
     DIV_ZERO = Value(Type.STRING, "div0")
     BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+    # "tree" walks the AST directly, "closure" compiles it into closures first (see closure_v4sol.py)
+    # and "bytecode" lowers it to instructions for a dispatch loop (see bytecode_v4sol.py).
+    # "tree_raise" walks the AST like "tree" but unwinds Brewin exceptions as Python exceptions
+    # (see raising_v4sol.py)
+    ENGINES = {"tree", "tree_raise", "closure", "bytecode"}
 
     # methods
-    def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+    # max_depth limits the nesting of calls and lazy evaluations on the "bytecode" engine, which
+    # keeps them on a frame stack of its own instead of the Python stack.
+    # memo_size turns on memoization of pure functions on the "tree" engine, keeping the results
+    # of up to that many calls (see memo_v4sol.py); memo.stats() reports how it did.
+    # output_sink replaces the default print-and-log output and input_provider the inp list or
+    # console input (see brewio.py).
+    # max_steps, max_allocations and timeout end a run that executes too many statements, holds
+    # too much memory or takes too long, each with an error type of its own (see limits_v4sol.py).
+    # profiler, a profile_v4sol.Profiler, collects call, statement and lazy value statistics of
+    # a run on the "tree" engine
+    # after a run, fold_stats holds what constant folding did to the program (see folder_v4sol.py)
+    def __init__(
+        self, console_output=True, inp=None, trace_output=False, engine="tree",
+        max_depth=VirtualMachine.MAX_DEPTH, memo_size=None, output_sink=None,
+        input_provider=None, max_steps=None, max_allocations=None, timeout=None, profiler=None,
+    ):
+        super().__init__(console_output, inp, output_sink, input_provider)
+        if engine not in Interpreter.ENGINES:
+            raise ValueError(f"Unknown engine {engine}")
+        if memo_size is not None and engine != "tree":
+            raise ValueError("Memoization is only available on the tree engine")
+        if profiler is not None and engine != "tree":
+            raise ValueError("Profiling is only available on the tree engine")
         self.trace_output = trace_output
+        self.engine = engine
+        self.max_depth = max_depth
+        self.memo_size = memo_size
+        self.memo = None
+        self.profiler = profiler
+        self.fold_stats = None
+        self.limits = None
+        if max_steps is not None or max_allocations is not None or timeout is not None:
+            self.limits = ResourceLimits(max_steps, max_allocations, timeout)
         self.__setup_ops()
 
     # run a program that's provided in a string
     # usese the provided Parser found in brewparse.py to parse the program
     # into an abstract syntax tree (ast)
     def run(self, program):
+        try:
+            self.__run(program)
+        finally:
+            if self.profiler is not None:
+                self.profiler.finish()
+            self.flush_output()
+            self.flush_output()
+
+    def __run(self, program):
         ast = parse_program(program)
-        self.__set_up_function_table(ast)
-        self.env = EnvironmentManager()
-        status, result = self.__call_func_aux("main", [])
+        folder = ConstantFolder(self.op_to_lambda)
+        folder.fold_program(ast)
+        self.fold_stats = folder.stats()
+        if self.trace_output:
+            print(f"constant folding removed {folder.removed} nodes")
+        Resolver().resolve_program(ast)
+        StrictnessAnalyzer().analyze_program(ast)
+        if self.engine == "closure":
+            main = ClosureCompiler(self).compile(ast)
+            self.__start_limits()
+            status, result = main()
+        elif self.engine == "bytecode":
+            code = BytecodeCompiler(self).compile(ast)
+            self.__start_limits()
+            status, result = VirtualMachine(self, self.max_depth).run(code)
+        elif self.engine == "tree_raise":
+            status, result = ExecStatus.CONTINUE, None
+            self.__start_limits()
+            try:
+                RaisingWalker(self).run(ast)
+            except BrewinRaise as exc:
+                status, result = ExecStatus.EXCEPTION, exc.value
+        else:
+            self.__set_up_function_table(ast)
+            # a memo hit skips the statements a trace would print, so tracing turns it off
+            if self.memo_size is not None and not self.trace_output:
+                self.memo_funcs = PurityAnalyzer().analyze_program(ast)
+                self.memo = MemoTable(self.memo_size)
+            if self.profiler is not None:
+                self.env = self.profiler.environment()
+            else:
+                self.env = EnvironmentManager()
+            self.__start_limits()
+            status, result = self.__call_func_aux("main", [])
         if status == ExecStatus.EXCEPTION:
             super().error(ErrorType.FAULT_ERROR, f"Exception {result.value()} not caught!")
 
+    def __start_limits(self):
+        if self.limits is not None:
+            self.limits.start(self)
 
     def __set_up_function_table(self, ast):
         self.func_name_to_ast = {}
-        for func_def in ast.get("functions"):
-            func_name = func_def.get("name")
-            num_params = len(func_def.get("args"))
+        self.call_targets = {}  # call node -> handler, for this run (see __call_func)
+        for func_def in ast.functions:
+            func_name = func_def.name
+            num_params = len(func_def.args)
             if func_name not in self.func_name_to_ast:
                 self.func_name_to_ast[func_name] = {}
             self.func_name_to_ast[func_name][num_params] = func_def
@@ -60,10 +144,18 @@ class Interpreter(InterpreterBase):
         return candidate_funcs[num_params]
 
     def __run_statements(self, statements):
+        limits = self.limits
+        profiler = self.profiler
         self.env.push_block()
         for statement in statements:
             if self.trace_output:
                 print(statement)
+            if profiler is not None:
+                profiler.statement(statement)
+            if limits is not None:
+                limits.countdown -= 1
+                if not limits.countdown:
+                    limits.check()
             status, return_val = self.__run_statement(statement)
             if status == ExecStatus.RETURN or status == ExecStatus.EXCEPTION:
                 self.env.pop_block()
@@ -95,9 +187,16 @@ class Interpreter(InterpreterBase):
         return (status, return_val)
 
     def __call_func(self, call_node):
-        func_name = call_node.get("name")
-        actual_args = call_node.get("args")
-        status, return_val = self.__call_func_aux(func_name, actual_args)
+        # the handler a call node resolves to is cached per run (inline cache), so only the
+        # first run of a call looks the function up by name and arity.  It is kept here rather
+        # than on the node because the handler is bound to this interpreter, and an AST can be
+        # run again by another one (AST cache, bundles, batch workers)
+        target = self.call_targets.get(call_node)
+        if target is None:
+            target = self.call_targets[call_node] = self.__resolve_call(
+                call_node.name, len(call_node.args)
+            )
+        status, return_val = target(call_node.args)
         if status == ExecStatus.EXCEPTION:
             return (status, return_val)  # return_val is the exception type
         if status == ExecStatus.RETURN:
@@ -105,35 +204,70 @@ class Interpreter(InterpreterBase):
         return (status, return_val)
 
     def __call_func_aux(self, func_name, actual_args):
+        return self.__resolve_call(func_name, len(actual_args))(actual_args)
+
+    # returns the handler that runs a call with the given actual args: a builtin, or the user
+    # function with that name and arity
+    def __resolve_call(self, func_name, num_args):
         if func_name == "print":
-            return self.__call_print(actual_args)
+            return self.__call_print
         if func_name == "inputi" or func_name == "inputs":
-            return self.__call_input(func_name, actual_args)
-
-        func_ast = self.__get_func_by_name(func_name, len(actual_args))
-        formal_args = func_ast.get("args")
-        if len(actual_args) != len(formal_args):
+            return functools.partial(self.__call_input, func_name)
+        func_ast = self.__get_func_by_name(func_name, num_args)
+        if num_args != len(func_ast.args):
             super().error(
                 ErrorType.NAME_ERROR,
-                f"Function {func_ast.get('name')} with {len(actual_args)} args not found",
+                f"Function {func_ast.name} with {num_args} args not found",
             )
+        return functools.partial(self.__call_user_func, func_ast)
 
-        # first evaluate all of the actual parameters and associate them with the formal parameter names
-        args = {}
-        for formal_ast, actual_ast in zip(formal_args, actual_args):
+    def __call_user_func(self, func_ast, actual_args):
+        # first evaluate all of the actual parameters
+        args = []
+        for actual_ast in actual_args:
             status, actual_arg = self.__eval_expr(actual_ast)
             if status == ExecStatus.EXCEPTION:
                 return (status, actual_arg)
-            result = copy.copy(actual_arg)
-            arg_name = formal_ast.get("name")
-            args[arg_name] = result
-
-        # then create the new activation record
-        self.env.push_func()
-        # and add the formal arguments to the activation record
-        for arg_name, value in args.items():
-          self.env.create(arg_name, value)
-        status, return_val = self.__run_statements(func_ast.get("statements"))
+            args.append(actual_arg)  # not copied, so the callee shares a lazy argument
+        return self.__run_func(func_ast, args)
+
+    # call a pure function whose result is forced right away, returning the forced result.  When
+    # every argument is already evaluated, the result is looked up in (or added to) the memo
+    def __call_memoized(self, func_ast, actual_args):
+        args = []
+        key = [func_ast]
+        for actual_ast in actual_args:
+            status, actual_arg = self.__eval_expr(actual_ast)
+            if status == ExecStatus.EXCEPTION:
+                return (status, actual_arg)
+            args.append(actual_arg)
+            if key is not None:
+                if actual_arg.evaluated():
+                    key.append((actual_arg.type(), actual_arg.value()))
+                else:
+                    key = None
+        if key is not None:
+            key = tuple(key)
+            result = self.memo.get(key)
+            if result is not None:
+                return result
+
+        status, return_val = self.__run_func(func_ast, args)
+        if status != ExecStatus.EXCEPTION:
+            status, return_val = self.__evaluate_if_necessary(return_val, True)
+        if key is not None:
+            self.memo.put(key, (status, return_val))
+        return (status, return_val)
+
+    def __run_func(self, func_ast, args):
+        # create the new activation record, whose first block holds the formal arguments
+        self.env.push_func([bind_params(func_ast.param_slots, args)])
+        if self.profiler is not None:
+            self.profiler.enter(func_ast)
+            status, return_val = self.__run_statements(func_ast.statements)
+            self.profiler.exit()
+        else:
+            status, return_val = self.__run_statements(func_ast.statements)
         self.env.pop_func()
         #print(f"call_func_aux: status: {status}, return_val: {return_val}")
         return (status, return_val)
@@ -159,30 +293,31 @@ class Interpreter(InterpreterBase):
             super().error(
                 ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter"
             )
-        inp = super().get_input()
         if name == "inputi":
-            return (ExecStatus.CONTINUE, Value(Type.INT, int(inp)))
+            return (ExecStatus.CONTINUE, int_value(super().get_input_int()))
         if name == "inputs":
-            return (ExecStatus.CONTINUE, Value(Type.STRING, inp))
+            return (ExecStatus.CONTINUE, Value(Type.STRING, super().get_input()))
 
     def __assign(self, assign_ast):
-        var_name = assign_ast.get("name")
-        status, value_obj = self.__eval_expr(assign_ast.get("expression"))
+        var_name = assign_ast.name
+        status, value_obj = self.__eval_expr(assign_ast.expression, assign_ast.strict)
         if status == ExecStatus.EXCEPTION:
             return (status, value_obj)
 
-        if not self.env.set(var_name, value_obj):
+        if assign_ast.addr is None:
             super().error(
                 ErrorType.NAME_ERROR, f"Undefined variable {var_name} in assignment"
             )
+        self.env.set(*assign_ast.addr, value_obj)
         return (status, value_obj)
 
     def __var_def(self, var_ast):
-        var_name = var_ast.get("name")
-        if not self.env.create(var_name, Interpreter.NIL_VALUE):
+        var_name = var_ast.name
+        if var_ast.addr is None:
             super().error(
                 ErrorType.NAME_ERROR, f"Duplicate definition for variable {var_name}"
             )
+        self.env.create(Interpreter.NIL_VALUE)
 
     # document that all type checking of lazy expressions is done only at the time of evaluation
     # document that all binary expressions are evaluated from left to right and so an exception on the first one will prevent the second one from being evaluated
@@ -191,29 +326,44 @@ class Interpreter(InterpreterBase):
         if expr_ast.elem_type == InterpreterBase.NIL_NODE:
             return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
         if expr_ast.elem_type == InterpreterBase.INT_NODE:
-            return (ExecStatus.CONTINUE, Value(Type.INT, expr_ast.get("val")))
+            return (ExecStatus.CONTINUE, int_value(expr_ast.val))
         if expr_ast.elem_type == InterpreterBase.STRING_NODE:
-            return (ExecStatus.CONTINUE, Value(Type.STRING, expr_ast.get("val")))
+            return (ExecStatus.CONTINUE, Value(Type.STRING, expr_ast.val))
         if expr_ast.elem_type == InterpreterBase.BOOL_NODE:
-            return (ExecStatus.CONTINUE, Value(Type.BOOL, expr_ast.get("val")))
+            return (ExecStatus.CONTINUE, bool_value(expr_ast.val))
 
         if eager is False:
+            if expr_ast.pure:  # no need for a LazyValue if it can be evaluated without effects
+                value = speculate(expr_ast, self.env, self.op_to_lambda)
+                if value is not None:
+                    return (ExecStatus.CONTINUE, value)
+                if expr_ast.elem_type == InterpreterBase.VAR_NODE and expr_ast.addr is not None:
+                    # the variable holds a lazy value: pass on that value itself, so every
+                    # alias of it shares the one result (call-by-need) instead of each new
+                    # wrapper forcing it again through its own copy
+                    return (ExecStatus.CONTINUE, self.env.get(*expr_ast.addr))
             #print(f"delaying evaluation: {expr_ast.elem_type}")
             #if (expr_ast.elem_type == "fcall"):
-            #    print("funcname: ", expr_ast.get("name"))
-            return (ExecStatus.CONTINUE, LazyValue(expr_ast, self.env.get_top_env()))
+            #    print("funcname: ", expr_ast.name)
+            if self.profiler is not None:
+                self.profiler.thunks_created += 1
+            return (ExecStatus.CONTINUE, LazyValue(expr_ast, self.env.capture(expr_ast.free)))
 
         #print(f"forcing evaluation: {expr_ast.elem_type}")
         #if (expr_ast.elem_type == "fcall"):
-        #    print("funcname: ", expr_ast.get("name"))
+        #    print("funcname: ", expr_ast.name)
 
         if expr_ast.elem_type == InterpreterBase.VAR_NODE:
-            var_name = expr_ast.get("name")
-            val = self.env.get(var_name)
-            if val is None:
+            if expr_ast.addr is None:
+                var_name = expr_ast.name
                 super().error(ErrorType.NAME_ERROR, f"Variable {var_name} not found")
+            val = self.env.get(*expr_ast.addr)
             return self.__evaluate_if_necessary(val, eager)
         if expr_ast.elem_type == InterpreterBase.FCALL_NODE:
+            if self.memo is not None:
+                func_ast = self.memo_funcs.get((expr_ast.name, len(expr_ast.args)))
+                if func_ast is not None:
+                    return self.__call_memoized(func_ast, expr_ast.args)
             status, result = self.__call_func(expr_ast)
             #print(f"FCALL: status: {status}, result: {result}")
             if status == ExecStatus.EXCEPTION:
@@ -234,28 +384,71 @@ class Interpreter(InterpreterBase):
             return (ExecStatus.CONTINUE, val)
 
         #print("eval if necessary")
-        env_to_eval = val.env()
-        self.env.push_func(env_to_eval)
-        status, evaluated_val = self.__eval_expr(val.ast(), True)
+        # a lazy function call is a tail call: the lazy value the function returns is forced by
+        # this loop after the call's frame is gone, so a chain of `return f(...)` runs in
+        # constant stack and environment space.  That value is a copy no one else holds, so only
+        # val has to cache the result.
+        target = val
+        while True:
+            dependency = self.__force_dependencies(val)
+            if dependency is not None:
+                return dependency
+            if self.profiler is not None:
+                self.profiler.thunks_forced += 1
+            env_to_eval = val.env()
+            self.env.push_func(env_to_eval)
+            expr_ast = val.ast()
+            func_ast = None
+            if expr_ast.elem_type == InterpreterBase.FCALL_NODE and self.memo is not None:
+                func_ast = self.memo_funcs.get((expr_ast.name, len(expr_ast.args)))
+            if func_ast is not None:
+                status, evaluated_val = self.__call_memoized(func_ast, expr_ast.args)
+            elif expr_ast.elem_type == InterpreterBase.FCALL_NODE:
+                status, evaluated_val = self.__call_func(expr_ast)
+            else:
+                status, evaluated_val = self.__eval_expr(expr_ast, True)
+            self.env.pop_func()
+            if status == ExecStatus.EXCEPTION or evaluated_val.evaluated():
+                break
+            val = evaluated_val
 
         # cache result
         #print("Caching result: ", evaluated_val.value())
         if status != ExecStatus.EXCEPTION:
-            val.set_type_value(evaluated_val.type(), evaluated_val.value())
+            target.set_type_value(evaluated_val.type(), evaluated_val.value())
             status = ExecStatus.CONTINUE
-
-        self.env.pop_func()
         return (status, evaluated_val)
 
+    # force the lazy value that evaluating val forces first (see strictness_v4sol.py), and the
+    # one that forces first, and so on, deepest first: each then finds the one it needs already
+    # evaluated, so `x = x + f();` run a million times is forced in a loop here instead of a
+    # million nested evaluations.  The order of effects is the same.  Returns the status and
+    # value of an exception one of them raised, which val's evaluation would have raised first
+    def __force_dependencies(self, val):
+        chain = []
+        var_ast = val.ast().first
+        while var_ast is not None and var_ast.addr is not None:
+            depth, slot = var_ast.addr
+            val = val.env()[depth][slot]
+            if val.evaluated():
+                break
+            chain.append(val)
+            var_ast = val.ast().first
+        for dependency in reversed(chain):
+            status, result = self.__evaluate_if_necessary(dependency, True)
+            if status == ExecStatus.EXCEPTION:
+                return (status, result)
+        return None
+
     def __eval_op(self, arith_ast):
         if arith_ast.elem_type in ["||", "&&"]:
             return self.__eval_logical(arith_ast)
 
-        left_status, left_value_obj = self.__eval_expr(arith_ast.get("op1"), True)
+        left_status, left_value_obj = self.__eval_expr(arith_ast.op1, True)
         if left_status == ExecStatus.EXCEPTION:
             return (ExecStatus.EXCEPTION, left_value_obj) # document: evaluate left side first so if both would throw execptions, only left gets thrown
 
-        right_status, right_value_obj = self.__eval_expr(arith_ast.get("op2"), True)
+        right_status, right_value_obj = self.__eval_expr(arith_ast.op2, True)
         if right_status == ExecStatus.EXCEPTION:
             return (ExecStatus.EXCEPTION, right_value_obj)
 
@@ -280,7 +473,7 @@ class Interpreter(InterpreterBase):
         return (ExecStatus.CONTINUE, f(left_value_obj, right_value_obj))
 
     def __eval_logical(self, arith_ast):
-        left_status, left_value_obj = self.__eval_expr(arith_ast.get("op1"), True)
+        left_status, left_value_obj = self.__eval_expr(arith_ast.op1, True)
         if left_status == ExecStatus.EXCEPTION:
             return (ExecStatus.EXCEPTION, left_value_obj)
         if left_value_obj.type() != Type.BOOL:
@@ -289,11 +482,11 @@ class Interpreter(InterpreterBase):
                 f"Incompatible type for {arith_ast.elem_type} operation",
             )
         if (arith_ast.elem_type == "||" and left_value_obj.value()):
-            return (ExecStatus.CONTINUE, Value(Type.BOOL, True))
+            return (ExecStatus.CONTINUE, bool_value(True))
         elif (arith_ast.elem_type == "&&" and not left_value_obj.value()):
-            return (ExecStatus.CONTINUE, Value(Type.BOOL, False))
+            return (ExecStatus.CONTINUE, bool_value(False))
         else:
-            right_status, right_value_obj = self.__eval_expr(arith_ast.get("op2"), True)
+            right_status, right_value_obj = self.__eval_expr(arith_ast.op2, True)
             if right_status == ExecStatus.EXCEPTION:
                 return (ExecStatus.EXCEPTION, right_value_obj)
             if right_value_obj.type() != Type.BOOL:
@@ -313,7 +506,7 @@ class Interpreter(InterpreterBase):
         return obj1.type() == obj2.type()
 
     def __eval_unary(self, arith_ast, t, f):
-        status, value_obj = self.__eval_expr(arith_ast.get("op1"), True)
+        status, value_obj = self.__eval_expr(arith_ast.op1, True)
         #print(f"evaluating unary: {status} {value_obj.value()} {value_obj.type()}")
         if status == ExecStatus.EXCEPTION:
             return (ExecStatus.EXCEPTION, value_obj)
@@ -323,74 +516,74 @@ class Interpreter(InterpreterBase):
                 ErrorType.TYPE_ERROR,
                 f"Incompatible type for {arith_ast.elem_type} operation",
             )
-        return (ExecStatus.CONTINUE, Value(t, f(value_obj.value())))
+        return (ExecStatus.CONTINUE, make_value(t, f(value_obj.value())))
 
     def __setup_ops(self):
         self.op_to_lambda = {}
         # set up operations on integers
         self.op_to_lambda[Type.INT] = {}
-        self.op_to_lambda[Type.INT]["+"] = lambda x, y: Value(
-            x.type(), x.value() + y.value()
+        self.op_to_lambda[Type.INT]["+"] = lambda x, y: int_value(
+            x.value() + y.value()
         )
-        self.op_to_lambda[Type.INT]["-"] = lambda x, y: Value(
-            x.type(), x.value() - y.value()
+        self.op_to_lambda[Type.INT]["-"] = lambda x, y: int_value(
+            x.value() - y.value()
         )
-        self.op_to_lambda[Type.INT]["*"] = lambda x, y: Value(
-            x.type(), x.value() * y.value()
+        self.op_to_lambda[Type.INT]["*"] = lambda x, y: int_value(
+            x.value() * y.value()
         )
-        self.op_to_lambda[Type.INT]["/"] = lambda x, y: Value(
-            x.type(), x.value() // y.value()
+        self.op_to_lambda[Type.INT]["/"] = lambda x, y: int_value(
+            x.value() // y.value()
         )
-        self.op_to_lambda[Type.INT]["=="] = lambda x, y: Value(
-            Type.BOOL, x.type() == y.type() and x.value() == y.value()
+        self.op_to_lambda[Type.INT]["=="] = lambda x, y: bool_value(
+            x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.INT]["!="] = lambda x, y: Value(
-            Type.BOOL, x.type() != y.type() or x.value() != y.value()
+        self.op_to_lambda[Type.INT]["!="] = lambda x, y: bool_value(
+            x.type() != y.type() or x.value() != y.value()
         )
-        self.op_to_lambda[Type.INT]["<"] = lambda x, y: Value(
-            Type.BOOL, x.value() < y.value()
+        self.op_to_lambda[Type.INT]["<"] = lambda x, y: bool_value(
+            x.value() < y.value()
         )
-        self.op_to_lambda[Type.INT]["<="] = lambda x, y: Value(
-            Type.BOOL, x.value() <= y.value()
+        self.op_to_lambda[Type.INT]["<="] = lambda x, y: bool_value(
+            x.value() <= y.value()
         )
-        self.op_to_lambda[Type.INT][">"] = lambda x, y: Value(
-            Type.BOOL, x.value() > y.value()
+        self.op_to_lambda[Type.INT][">"] = lambda x, y: bool_value(
+            x.value() > y.value()
         )
-        self.op_to_lambda[Type.INT][">="] = lambda x, y: Value(
-            Type.BOOL, x.value() >= y.value()
+        self.op_to_lambda[Type.INT][">="] = lambda x, y: bool_value(
+            x.value() >= y.value()
         )
         #  set up operations on strings
         self.op_to_lambda[Type.STRING] = {}
         self.op_to_lambda[Type.STRING]["+"] = lambda x, y: Value(
             x.type(), x.value() + y.value()
         )
-        self.op_to_lambda[Type.STRING]["=="] = lambda x, y: Value(
-            Type.BOOL, x.value() == y.value()
+        self.op_to_lambda[Type.STRING]["=="] = lambda x, y: bool_value(
+            x.value() == y.value()
         )
-        self.op_to_lambda[Type.STRING]["!="] = lambda x, y: Value(
-            Type.BOOL, x.value() != y.value()
+        self.op_to_lambda[Type.STRING]["!="] = lambda x, y: bool_value(
+            x.value() != y.value()
         )
         #  set up operations on bools
         self.op_to_lambda[Type.BOOL] = {}
 
-        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: Value(
-            Type.BOOL, x.type() == y.type() and x.value() == y.value()
+        self.op_to_lambda[Type.BOOL]["=="] = lambda x, y: bool_value(
+            x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: Value(
-            Type.BOOL, x.type() != y.type() or x.value() != y.value()
+        self.op_to_lambda[Type.BOOL]["!="] = lambda x, y: bool_value(
+            x.type() != y.type() or x.value() != y.value()
         )
 
         #  set up operations on nil
         self.op_to_lambda[Type.NIL] = {}
-        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: Value(
-            Type.BOOL, x.type() == y.type() and x.value() == y.value()
+        self.op_to_lambda[Type.NIL]["=="] = lambda x, y: bool_value(
+            x.type() == y.type() and x.value() == y.value()
         )
-        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: Value(
-            Type.BOOL, x.type() != y.type() or x.value() != y.value()
+        self.op_to_lambda[Type.NIL]["!="] = lambda x, y: bool_value(
+            x.type() != y.type() or x.value() != y.value()
         )
 
     def __do_if(self, if_ast):
-        cond_ast = if_ast.get("condition")
+        cond_ast = if_ast.condition
         status, result = self.__eval_expr(cond_ast, True) # document forced evaluation
         if status == ExecStatus.EXCEPTION:
             return (status, result)
@@ -401,11 +594,11 @@ class Interpreter(InterpreterBase):
                 "Incompatible type for if condition",
             )
         if result.value():
-            statements = if_ast.get("statements")
+            statements = if_ast.statements
             status, return_val = self.__run_statements(statements)
             return (status, return_val)
         else:
-            else_statements = if_ast.get("else_statements")
+            else_statements = if_ast.else_statements
             if else_statements is not None:
                 status, return_val = self.__run_statements(else_statements)
                 return (status, return_val)
@@ -413,11 +606,14 @@ class Interpreter(InterpreterBase):
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
     def __do_for(self, for_ast):
-        init_ast = for_ast.get("init")
-        cond_ast = for_ast.get("condition")
-        update_ast = for_ast.get("update")
+        init_ast = for_ast.init
+        cond_ast = for_ast.condition
+        update_ast = for_ast.update
 
-        self.__run_statement(init_ast)  # initialize counter variable
+        # initialize counter variable; only a strict init (see strictness_v4sol.py) can raise
+        status, return_val = self.__run_statement(init_ast)
+        if status == ExecStatus.EXCEPTION:
+            return (status, return_val)
         run_for = Interpreter.TRUE_VALUE
         while run_for.value():
             status, run_for = self.__eval_expr(cond_ast, True)  # check for-loop condition # document forced evaluation
@@ -430,28 +626,34 @@ class Interpreter(InterpreterBase):
                     "Incompatible type for for condition",
                 )
             if run_for.value():
-                statements = for_ast.get("statements")
+                statements = for_ast.statements
                 status, return_val = self.__run_statements(statements)
                 if status == ExecStatus.RETURN or status == ExecStatus.EXCEPTION:
                     return status, return_val
-                self.__run_statement(update_ast)  # update counter variable
+                status, return_val = self.__run_statement(update_ast)  # update counter variable
+                if status == ExecStatus.EXCEPTION:
+                    return (status, return_val)
 
         return (ExecStatus.CONTINUE, Interpreter.NIL_VALUE)
 
     # document return expression is lazy
     def __do_return(self, return_ast):
-        expr_ast = return_ast.get("expression")
+        expr_ast = return_ast.expression
         if expr_ast is None:
             return (ExecStatus.RETURN, Interpreter.NIL_VALUE)
         status, ret_val = self.__eval_expr(expr_ast)
         if status == ExecStatus.EXCEPTION:
             return (status, ret_val)
+        if not ret_val.evaluated() and expr_ast.elem_type == InterpreterBase.VAR_NODE:
+            # the caller forces a returned lazy value in place without caching into it (see
+            # __evaluate_if_necessary), so a shared one is returned behind a new lazy value
+            ret_val = LazyValue(expr_ast, self.env.capture(expr_ast.free))
         return (ExecStatus.RETURN, copy.copy(ret_val))
 
     # document we will never raise in an expression used by a raise (e.g. raise foo(), foo() will never raise itself)
     # document that raise argument evaluation is eager
     def __do_raise(self, return_ast):
-        expr_ast = return_ast.get("exception_type")
+        expr_ast = return_ast.exception_type
         #print("RAISE: ", expr_ast)
         _, exception_type = self.__eval_expr(expr_ast, True)
         value_obj = copy.copy(exception_type)
@@ -463,15 +665,15 @@ class Interpreter(InterpreterBase):
         return (ExecStatus.EXCEPTION, value_obj)
 
     def __do_try(self, try_ast):
-        statements = try_ast.get("statements")
+        statements = try_ast.statements
         status, return_val = self.__run_statements(statements)
         if status != ExecStatus.EXCEPTION:
             return (status, return_val)
-        catchers = try_ast.get("catchers")
+        catchers = try_ast.catchers
         for catcher_ast in catchers:
-            exception_type = catcher_ast.get("exception_type")
+            exception_type = catcher_ast.exception_type
             if return_val.value() == exception_type:
-                return self.__run_statements(catcher_ast.get("statements"))
+                return self.__run_statements(catcher_ast.statements)
 
         # propagate error
         return (status, return_val)
\ No newline at end of file
@@ -0,0 +1,87 @@
+import gc
+import sys
+import time
+
+from intbase import ErrorType
+
+# Per-run resource limits for interpreterv4sol, so an untrusted program (an endless for loop,
+# runaway recursion) ends with an error instead of hanging the process that runs it:
+#  - max_steps bounds the statements the program executes,
+#  - max_allocations bounds the memory blocks (Values, lazy values, environment frames, ...)
+#    the run holds on to beyond those live when it started, as sys.getallocatedblocks() counts
+#    them, so it measures what is live rather than what was ever allocated.  The count is
+#    approximate and covers the whole process: anything else that allocates while the program
+#    runs (another thread, the parser's caches on first use) counts too.  Garbage is collected
+#    before the starting count is taken and again before a run is stopped, so uncollected
+#    cycles never end a run,
+#  - timeout bounds the wall-clock seconds the program runs for (time spent blocked reading
+#    console input counts, but the run only notices at its next statement).
+# Each ends the run through interp.error() with an ErrorType of its own, which a Brewin try
+# cannot catch.  The engines count a step per statement with a decrement of countdown and only
+# call check() when it reaches zero, every CHECK_INTERVAL steps, so the clock and the allocator
+# are consulted rarely and an unlimited run pays nothing beyond testing for limits being None.
+
+
+class ResourceLimits:
+    CHECK_INTERVAL = 1000
+
+    def __init__(self, max_steps=None, max_allocations=None, timeout=None):
+        self.max_steps = max_steps
+        self.max_allocations = max_allocations
+        self.timeout = timeout
+
+    # call as the program starts running; measures from here
+    def start(self, interp):
+        self.interp = interp
+        self.steps = 0  # steps counted up to the start of the current interval
+        if self.max_allocations is not None:
+            gc.collect()  # so garbage left by earlier work is not in the baseline
+        self.base_blocks = sys.getallocatedblocks()
+        self.deadline = None
+        if self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout
+        self.__next_interval()
+
+    # the engines call this once countdown reaches zero
+    def check(self):
+        steps = self.steps + self.interval
+        if self.max_steps is not None and steps > self.max_steps:
+            self.interp.error(
+                ErrorType.STEP_LIMIT_ERROR, f"Program ran more than {self.max_steps} steps"
+            )
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.interp.error(
+                ErrorType.TIMEOUT_ERROR, f"Program ran longer than {self.timeout} seconds"
+            )
+        if (
+            self.max_allocations is not None
+            and sys.getallocatedblocks() - self.base_blocks > self.max_allocations
+            and self.__live_blocks() > self.max_allocations
+        ):
+            self.interp.error(
+                ErrorType.MEMORY_LIMIT_ERROR,
+                f"Program holds more than {self.max_allocations} allocations",
+            )
+        self.steps = steps
+        self.__next_interval()
+
+    # blocks held beyond the baseline once garbage is collected; only called once the cheap
+    # count is over the limit, as a full collection every interval would cost too much
+    def __live_blocks(self):
+        gc.collect()
+        return sys.getallocatedblocks() - self.base_blocks
+
+    # the last interval before max_steps is cut short so the step past it is the one checked
+    def __next_interval(self):
+        interval = ResourceLimits.CHECK_INTERVAL
+        if self.max_steps is not None:
+            interval = min(interval, self.max_steps - self.steps + 1)
+        self.interval = interval
+        self.countdown = interval
+
+    # what the run has used so far, or used up to the error that ended it
+    def used(self):
+        return {
+            "steps": self.steps + self.interval - self.countdown,
+            "allocations": sys.getallocatedblocks() - self.base_blocks,
+        }
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+
+from intbase import InterpreterBase
+
+# Opt-in memoization of pure Brewin functions for the tree walker in interpreterv4sol.
+#
+# PurityAnalyzer finds the functions whose result can only depend on the values of their
+# arguments: their bodies never call print, inputi or inputs, never assign a struct field or
+# use new, and only call functions that are pure themselves.  Functions are assumed pure and
+# the ones that break a rule, or call a function that does, are removed until nothing changes,
+# so (mutually) recursive pure functions stay pure.
+#
+# The interpreter only consults the memo where a call's result is forced right away, and only
+# when every argument is already evaluated, so a hit skips work the program was going to do
+# anyway and never forces anything it would have left lazy.  The memo holds the (status, value)
+# pair the forced call produced, so a raised exception is replayed like a return value.
+
+
+class PurityAnalyzer:
+    BUILTINS = {"print", "inputi", "inputs"}
+    BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+
+    # returns {(name, arity): Func node} for the pure functions of the program
+    def analyze_program(self, ast):
+        funcs = {}
+        for func_def in ast.functions:
+            funcs[(func_def.name, len(func_def.args))] = func_def  # the last definition wins
+        callees = {}
+        pure = set()
+        for key, func_def in funcs.items():
+            self.calls = set()
+            if self.__pure_block(func_def.statements):
+                pure.add(key)
+                callees[key] = self.calls
+
+        changed = True
+        while changed:
+            changed = False
+            for key in list(pure):
+                if not callees[key] <= pure:
+                    pure.discard(key)
+                    changed = True
+        return {key: funcs[key] for key in pure}
+
+    def __pure_block(self, statements):
+        return all(self.__pure_statement(statement) for statement in statements)
+
+    def __pure_statement(self, statement):
+        kind = statement.elem_type
+        if kind == "=":
+            return "." not in statement.name and self.__pure_expr(statement.expression)
+        if kind == InterpreterBase.VAR_DEF_NODE:
+            return True
+        if kind == InterpreterBase.RETURN_NODE:
+            return statement.expression is None or self.__pure_expr(statement.expression)
+        if kind == InterpreterBase.RAISE_NODE:
+            return self.__pure_expr(statement.exception_type)
+        if kind == InterpreterBase.IF_NODE:
+            return (
+                self.__pure_expr(statement.condition)
+                and self.__pure_block(statement.statements)
+                and (
+                    statement.else_statements is None
+                    or self.__pure_block(statement.else_statements)
+                )
+            )
+        if kind == InterpreterBase.FOR_NODE:
+            return (
+                self.__pure_statement(statement.init)
+                and self.__pure_expr(statement.condition)
+                and self.__pure_statement(statement.update)
+                and self.__pure_block(statement.statements)
+            )
+        if kind == InterpreterBase.TRY_NODE:
+            return self.__pure_block(statement.statements) and all(
+                self.__pure_block(catcher.statements) for catcher in statement.catchers
+            )
+        return self.__pure_expr(statement)
+
+    def __pure_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.FCALL_NODE:
+            if expr_ast.name in PurityAnalyzer.BUILTINS:
+                return False
+            self.calls.add((expr_ast.name, len(expr_ast.args)))
+            return all(self.__pure_expr(arg) for arg in expr_ast.args)
+        if kind == InterpreterBase.NEW_NODE:
+            return False
+        if kind == InterpreterBase.VAR_NODE:
+            return "." not in expr_ast.name
+        if kind == InterpreterBase.NEG_NODE or kind == InterpreterBase.NOT_NODE:
+            return self.__pure_expr(expr_ast.op1)
+        if kind in PurityAnalyzer.BIN_OPS:
+            return self.__pure_expr(expr_ast.op1) and self.__pure_expr(expr_ast.op2)
+        return True  # a literal
+
+
+# results of pure calls keyed by (Func node, argument types and values), least recently used
+# first; holds at most maxsize entries
+class MemoTable:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self.entries[key] = result
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+        }
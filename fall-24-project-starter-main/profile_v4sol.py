@@ -0,0 +1,116 @@
+import sys
+import time
+
+from env_v4sol import EnvironmentManager
+
+# Profiler for the tree walker of interpreterv4sol: Interpreter(engine="tree", profiler=Profiler())
+# records, for one run,
+#  - per function (name/arity): calls, inclusive time and exclusive time (inclusive minus the
+#    time spent in the functions it called),
+#  - per statement line: how many times a statement on that line ran,
+#  - how many lazy values were created and how many were forced, and
+#  - how many bytes the environments lazy values capture take (EnvironmentManager.capture: the
+#    list of blocks plus the dict of each block an expression reads).
+# Lazy evaluation runs a deferred expression in whatever function forces it, so its time is
+# counted there.  report() formats the tables and write_collapsed() writes the exclusive time of
+# every call stack in the collapsed format flamegraph.pl and speedscope read, one
+# "main/0;f/1;g/2 <microseconds>" line per stack.
+# Without a profiler the interpreter only tests self.profiler for None at each call, statement
+# and lazy value it makes.
+
+
+class FuncStats:
+    def __init__(self):
+        self.calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+
+# an EnvironmentManager that adds the size of every environment it captures to its profiler
+class _CountingEnvironmentManager(EnvironmentManager):
+    def __init__(self, profiler):
+        super().__init__()
+        self.profiler = profiler
+
+    def capture(self, free):
+        env = super().capture(free)
+        size = sys.getsizeof(env)
+        for block in env:
+            if block is not None:
+                size += sys.getsizeof(block)
+        self.profiler.env_capture_bytes += size
+        return env
+
+
+class Profiler:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.funcs = {}  # "name/arity" -> FuncStats
+        self.lines = {}  # line -> statements run
+        self.stacks = {}  # "main/0;f/1" -> exclusive seconds
+        self.thunks_created = 0
+        self.thunks_forced = 0
+        self.env_capture_bytes = 0
+        self.stack = []  # [name, start, time in callees] of each call in progress
+        self.path = []  # the names in stack, joined for the stacks keys
+
+    # the environment manager the interpreter uses while profiling
+    def environment(self):
+        return _CountingEnvironmentManager(self)
+
+    def enter(self, func_ast):
+        name = f"{func_ast.name}/{len(func_ast.args)}"
+        self.path.append(name)
+        self.stack.append([name, self.clock(), 0.0])
+
+    def exit(self):
+        name, start, in_callees = self.stack.pop()
+        elapsed = self.clock() - start
+        stats = self.funcs.get(name)
+        if stats is None:
+            stats = self.funcs[name] = FuncStats()
+        stats.calls += 1
+        stats.inclusive += elapsed
+        stats.exclusive += elapsed - in_callees
+        key = ";".join(self.path)
+        self.stacks[key] = self.stacks.get(key, 0.0) + elapsed - in_callees
+        self.path.pop()
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+    def statement(self, statement):
+        line = getattr(statement, "line", None)
+        self.lines[line] = self.lines.get(line, 0) + 1
+
+    # a run that ends with an error leaves calls in progress; close them so their time counts
+    def finish(self):
+        while self.stack:
+            self.exit()
+
+    def report(self, limit=20):
+        out = [f"{'function':<24}{'calls':>10}{'incl ms':>12}{'excl ms':>12}"]
+        by_time = sorted(self.funcs.items(), key=lambda item: item[1].exclusive, reverse=True)
+        for name, stats in by_time[:limit]:
+            out.append(
+                f"{name:<24}{stats.calls:>10}{stats.inclusive * 1000:>12.2f}"
+                f"{stats.exclusive * 1000:>12.2f}"
+            )
+        out.append("")
+        out.append(f"{'line':<24}{'statements':>10}")
+        by_count = sorted(self.lines.items(), key=lambda item: item[1], reverse=True)
+        for line, count in by_count[:limit]:
+            out.append(f"{'?' if line is None else line:<24}{count:>10}")
+        out.append("")
+        out.append(f"lazy values created: {self.thunks_created}")
+        out.append(f"lazy values forced: {self.thunks_forced}")
+        out.append(f"environment bytes captured: {self.env_capture_bytes}")
+        return "\n".join(out)
+
+    # f is a file name or an open text file
+    def write_collapsed(self, f):
+        if isinstance(f, str):
+            with open(f, "w") as out:
+                self.write_collapsed(out)
+            return
+        for key, seconds in sorted(self.stacks.items()):
+            f.write(f"{key} {round(seconds * 1e6)}\n")
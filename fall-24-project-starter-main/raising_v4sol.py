@@ -0,0 +1,354 @@
+import copy
+import functools
+
+from env_v4sol import EnvironmentManager
+from intbase import InterpreterBase, ErrorType
+from resolver_v4sol import bind_params
+from strictness_v4sol import speculate
+from type_valuev4sol import (
+    BrewinRaise, Type, Value, LazyValue, bool_value, create_value, get_printable, int_value,
+    make_value,
+)
+
+# Tree walker for interpreterv4sol that propagates Brewin exceptions as Python exceptions.
+# The "tree" engine returns an (ExecStatus, value) pair from every statement, expression and
+# call and tests the status after each one; here expressions return bare Values, statements
+# return None to continue or the Value of a return, and raise (or a div0) throws BrewinRaise,
+# which only __do_try and the caller of run() catch.  Exception-free code never builds a
+# status pair or tests one.  Blocks and frames are popped in finally clauses, so unwinding
+# leaves the environment as the status-returning walker would.
+
+
+class RaisingWalker:
+    NIL_VALUE = create_value(InterpreterBase.NIL_DEF)
+    DIV_ZERO = Value(Type.STRING, "div0")
+    BIN_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<=", "||", "&&"}
+
+    # interp is the Interpreter used for output, input, errors and its op_to_lambda table
+    def __init__(self, interp):
+        self.interp = interp
+        self.env = EnvironmentManager()
+        self.op_to_lambda = interp.op_to_lambda
+        self.trace_output = interp.trace_output
+        self.limits = interp.limits
+
+    # run main() of a program already annotated by resolver_v4sol; raises BrewinRaise if an
+    # exception is not caught
+    def run(self, ast):
+        self.__set_up_function_table(ast)
+        self.__call_func_aux("main", [])
+
+    def __set_up_function_table(self, ast):
+        self.func_name_to_ast = {}
+        self.call_targets = {}  # call node -> handler, for this run
+        for func_def in ast.functions:
+            func_name = func_def.name
+            num_params = len(func_def.args)
+            if func_name not in self.func_name_to_ast:
+                self.func_name_to_ast[func_name] = {}
+            self.func_name_to_ast[func_name][num_params] = func_def
+
+    def __get_func_by_name(self, name, num_params):
+        if name not in self.func_name_to_ast:
+            self.interp.error(ErrorType.NAME_ERROR, f"Function {name} not found")
+        candidate_funcs = self.func_name_to_ast[name]
+        if num_params not in candidate_funcs:
+            self.interp.error(
+                ErrorType.NAME_ERROR,
+                f"Function {name} taking {num_params} params not found",
+            )
+        return candidate_funcs[num_params]
+
+    # returns the Value of a return statement, or None if the block ran to its end
+    def __run_statements(self, statements):
+        limits = self.limits
+        self.env.push_block()
+        try:
+            for statement in statements:
+                if self.trace_output:
+                    print(statement)
+                if limits is not None:
+                    limits.countdown -= 1
+                    if not limits.countdown:
+                        limits.check()
+                return_val = self.__run_statement(statement)
+                if return_val is not None:
+                    return return_val
+            return None
+        finally:
+            self.env.pop_block()
+
+    def __run_statement(self, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.FCALL_NODE:
+            self.__call_func(statement)
+        elif kind == "=":
+            self.__assign(statement)
+        elif kind == InterpreterBase.VAR_DEF_NODE:
+            self.__var_def(statement)
+        elif kind == InterpreterBase.RETURN_NODE:
+            return self.__do_return(statement)
+        elif kind == InterpreterBase.RAISE_NODE:
+            self.__do_raise(statement)
+        elif kind == InterpreterBase.IF_NODE:
+            return self.__do_if(statement)
+        elif kind == InterpreterBase.FOR_NODE:
+            return self.__do_for(statement)
+        elif kind == InterpreterBase.TRY_NODE:
+            return self.__do_try(statement)
+        return None
+
+    # returns the (possibly lazy) Value the function returned; the handler is cached per run as
+    # in Interpreter.__call_func
+    def __call_func(self, call_node):
+        target = self.call_targets.get(call_node)
+        if target is None:
+            target = self.call_targets[call_node] = self.__resolve_call(
+                call_node.name, len(call_node.args)
+            )
+        return target(call_node.args)
+
+    def __call_func_aux(self, func_name, actual_args):
+        return self.__resolve_call(func_name, len(actual_args))(actual_args)
+
+    def __resolve_call(self, func_name, num_args):
+        if func_name == "print":
+            return self.__call_print
+        if func_name == "inputi" or func_name == "inputs":
+            return functools.partial(self.__call_input, func_name)
+        func_ast = self.__get_func_by_name(func_name, num_args)
+        if num_args != len(func_ast.args):
+            self.interp.error(
+                ErrorType.NAME_ERROR,
+                f"Function {func_ast.name} with {num_args} args not found",
+            )
+        return functools.partial(self.__call_user_func, func_ast)
+
+    def __call_user_func(self, func_ast, actual_args):
+        args = [self.__eval_expr(actual_ast) for actual_ast in actual_args]
+        self.env.push_func([bind_params(func_ast.param_slots, args)])
+        try:
+            return_val = self.__run_statements(func_ast.statements)
+        finally:
+            self.env.pop_func()
+        if return_val is None:
+            return RaisingWalker.NIL_VALUE
+        return return_val
+
+    # print is all or nothing: an exception in any argument prints nothing
+    def __call_print(self, args):
+        output = ""
+        for arg in args:
+            output = output + get_printable(self.__eval_expr(arg, True))
+        self.interp.output(output)
+        return RaisingWalker.NIL_VALUE
+
+    def __call_input(self, name, args):
+        if args is not None and len(args) == 1:
+            self.interp.output(get_printable(self.__eval_expr(args[0], True)))
+        elif args is not None and len(args) > 1:
+            self.interp.error(
+                ErrorType.NAME_ERROR, "No inputi() function that takes > 1 parameter"
+            )
+        if name == "inputi":
+            return int_value(self.interp.get_input_int())
+        return Value(Type.STRING, self.interp.get_input())
+
+    def __assign(self, assign_ast):
+        value_obj = self.__eval_expr(assign_ast.expression, assign_ast.strict)
+        if assign_ast.addr is None:
+            self.interp.error(
+                ErrorType.NAME_ERROR, f"Undefined variable {assign_ast.name} in assignment"
+            )
+        self.env.set(*assign_ast.addr, value_obj)
+
+    def __var_def(self, var_ast):
+        if var_ast.addr is None:
+            self.interp.error(
+                ErrorType.NAME_ERROR, f"Duplicate definition for variable {var_ast.name}"
+            )
+        self.env.create(RaisingWalker.NIL_VALUE)
+
+    def __eval_expr(self, expr_ast, eager=False):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.NIL_NODE:
+            return RaisingWalker.NIL_VALUE
+        if kind == InterpreterBase.INT_NODE:
+            return int_value(expr_ast.val)
+        if kind == InterpreterBase.STRING_NODE:
+            return Value(Type.STRING, expr_ast.val)
+        if kind == InterpreterBase.BOOL_NODE:
+            return bool_value(expr_ast.val)
+
+        if eager is False:
+            if expr_ast.pure:
+                value = speculate(expr_ast, self.env, self.op_to_lambda)
+                if value is not None:
+                    return value
+                if kind == InterpreterBase.VAR_NODE and expr_ast.addr is not None:
+                    # share the lazy value the variable holds (see Interpreter.__eval_expr)
+                    return self.env.get(*expr_ast.addr)
+            return LazyValue(expr_ast, self.env.capture(expr_ast.free))
+
+        if kind == InterpreterBase.VAR_NODE:
+            if expr_ast.addr is None:
+                self.interp.error(ErrorType.NAME_ERROR, f"Variable {expr_ast.name} not found")
+            return self.__force(self.env.get(*expr_ast.addr))
+        if kind == InterpreterBase.FCALL_NODE:
+            return self.__force(self.__call_func(expr_ast))
+        if kind in RaisingWalker.BIN_OPS:
+            return self.__eval_op(expr_ast)
+        if kind == InterpreterBase.NEG_NODE:
+            return self.__eval_unary(expr_ast, Type.INT, lambda x: -1 * x)
+        if kind == InterpreterBase.NOT_NODE:
+            return self.__eval_unary(expr_ast, Type.BOOL, lambda x: not x)
+
+    # evaluate a lazy value in the environment it captured and cache the result; a value whose
+    # evaluation raises stays unevaluated.  A lazy function call is a tail call, forced by this
+    # loop once the call's frame is gone (see Interpreter.__evaluate_if_necessary)
+    def __force(self, val):
+        if val.evaluated():
+            return val
+        target = val
+        while True:
+            self.__force_dependencies(val)
+            self.env.push_func(val.env())
+            expr_ast = val.ast()
+            try:
+                if expr_ast.elem_type == InterpreterBase.FCALL_NODE:
+                    evaluated_val = self.__call_func(expr_ast)
+                else:
+                    evaluated_val = self.__eval_expr(expr_ast, True)
+            finally:
+                self.env.pop_func()
+            if evaluated_val.evaluated():
+                break
+            val = evaluated_val
+        target.set_type_value(evaluated_val.type(), evaluated_val.value())
+        return evaluated_val
+
+    # force the chain of lazy values val forces first, deepest first, so that it is forced by
+    # this loop rather than by recursion (see Interpreter.__force_dependencies)
+    def __force_dependencies(self, val):
+        chain = []
+        var_ast = val.ast().first
+        while var_ast is not None and var_ast.addr is not None:
+            depth, slot = var_ast.addr
+            val = val.env()[depth][slot]
+            if val.evaluated():
+                break
+            chain.append(val)
+            var_ast = val.ast().first
+        for dependency in reversed(chain):
+            self.__force(dependency)
+
+    def __eval_op(self, arith_ast):
+        kind = arith_ast.elem_type
+        if kind == "||" or kind == "&&":
+            return self.__eval_logical(arith_ast)
+
+        left_value_obj = self.__eval_expr(arith_ast.op1, True)
+        right_value_obj = self.__eval_expr(arith_ast.op2, True)
+        if kind not in ("==", "!=") and left_value_obj.type() != right_value_obj.type():
+            self.interp.error(
+                ErrorType.TYPE_ERROR,
+                f"Incompatible types for {kind} operation",
+            )
+        if kind not in self.op_to_lambda[left_value_obj.type()]:
+            self.interp.error(
+                ErrorType.TYPE_ERROR,
+                f"Incompatible operator {kind} for type {left_value_obj.type()}",
+            )
+        if kind == "/" and right_value_obj.value() == 0:
+            raise BrewinRaise(RaisingWalker.DIV_ZERO)
+        return self.op_to_lambda[left_value_obj.type()][kind](left_value_obj, right_value_obj)
+
+    def __eval_logical(self, arith_ast):
+        left_value_obj = self.__eval_expr(arith_ast.op1, True)
+        if left_value_obj.type() != Type.BOOL:
+            self.interp.error(
+                ErrorType.TYPE_ERROR,
+                f"Incompatible type for {arith_ast.elem_type} operation",
+            )
+        if arith_ast.elem_type == "||" and left_value_obj.value():
+            return bool_value(True)
+        if arith_ast.elem_type == "&&" and not left_value_obj.value():
+            return bool_value(False)
+        right_value_obj = self.__eval_expr(arith_ast.op2, True)
+        if right_value_obj.type() != Type.BOOL:
+            self.interp.error(
+                ErrorType.TYPE_ERROR,
+                f"Incompatible type for {arith_ast.elem_type} operation",
+            )
+        return right_value_obj
+
+    def __eval_unary(self, arith_ast, t, f):
+        value_obj = self.__eval_expr(arith_ast.op1, True)
+        if value_obj.type() != t:
+            self.interp.error(
+                ErrorType.TYPE_ERROR,
+                f"Incompatible type for {arith_ast.elem_type} operation",
+            )
+        return make_value(t, f(value_obj.value()))
+
+    def __do_if(self, if_ast):
+        result = self.__eval_expr(if_ast.condition, True)
+        if result.type() != Type.BOOL:
+            self.interp.error(
+                ErrorType.TYPE_ERROR,
+                "Incompatible type for if condition",
+            )
+        if result.value():
+            return self.__run_statements(if_ast.statements)
+        if if_ast.else_statements is not None:
+            return self.__run_statements(if_ast.else_statements)
+        return None
+
+    def __do_for(self, for_ast):
+        cond_ast = for_ast.condition
+        statements = for_ast.statements
+        self.__run_statement(for_ast.init)
+        while True:
+            run_for = self.__eval_expr(cond_ast, True)
+            if run_for.type() != Type.BOOL:
+                self.interp.error(
+                    ErrorType.TYPE_ERROR,
+                    "Incompatible type for for condition",
+                )
+            if not run_for.value():
+                return None
+            return_val = self.__run_statements(statements)
+            if return_val is not None:
+                return return_val
+            self.__run_statement(for_ast.update)
+
+    # the return expression is lazy
+    def __do_return(self, return_ast):
+        expr_ast = return_ast.expression
+        if expr_ast is None:
+            return RaisingWalker.NIL_VALUE
+        ret_val = self.__eval_expr(expr_ast)
+        if not ret_val.evaluated() and expr_ast.elem_type == InterpreterBase.VAR_NODE:
+            # returned behind a new lazy value (see Interpreter.__do_return)
+            ret_val = LazyValue(expr_ast, self.env.capture(expr_ast.free))
+        return copy.copy(ret_val)
+
+    # the raise argument is evaluated eagerly; an exception it raises itself propagates instead
+    def __do_raise(self, raise_ast):
+        exception_type = self.__eval_expr(raise_ast.exception_type, True)
+        value_obj = copy.copy(exception_type)
+        if exception_type.type() != Type.STRING:
+            self.interp.error(
+                ErrorType.TYPE_ERROR,
+                f"Invalid type for raise argument: {value_obj.type()}",
+            )
+        raise BrewinRaise(value_obj)
+
+    def __do_try(self, try_ast):
+        try:
+            return self.__run_statements(try_ast.statements)
+        except BrewinRaise as exc:
+            for catcher_ast in try_ast.catchers:
+                if exc.value.value() == catcher_ast.exception_type:
+                    return self.__run_statements(catcher_ast.statements)
+            raise
@@ -0,0 +1,118 @@
+from intbase import InterpreterBase
+
+# Static pass run on the AST before execution.  Every variable reference, assignment and variable
+# definition gets an `addr` attribute holding the (depth, slot) of its variable in the frame of
+# the enclosing function: depth counts blocks from the parameter block (0) inwards, and slot is
+# the position of the definition within its block.  Blocks are entered and left in lexical order
+# and the definitions of a block run in textual order, so a name refers to the closest
+# definition that precedes it in the same or an enclosing block.
+# addr is None for a name with no visible definition and for a duplicate definition in the same
+# block; the interpreter reports the NAME_ERROR when such a node runs, as it did before.
+# Function nodes get `param_slots`: None when the parameter names are distinct (argument i goes
+# to slot i), otherwise the slot of each formal parameter, as a repeated name shares one slot
+# and the last argument passed for it wins.
+# Expression nodes get `free`: the variables the expression reads, so a lazy value of it can
+# capture just those (EnvironmentManager.capture).  It is (size, ((depth, (slot, ...)), ...)),
+# size being one more than the deepest block used and the depths and slots in increasing order.
+
+
+class Resolver:
+    def resolve_program(self, ast):
+        for func_def in ast.functions:
+            self.__resolve_func(func_def)
+        return ast
+
+    def __resolve_func(self, func_def):
+        params = {}
+        param_slots = []
+        for arg in func_def.args:
+            name = arg.name
+            if name not in params:
+                params[name] = len(params)
+            param_slots.append(params[name])
+        func_def.param_slots = None if len(params) == len(param_slots) else param_slots
+        self.scopes = [params]
+        self.__resolve_block(func_def.statements)
+
+    def __resolve_block(self, statements):
+        self.scopes.append({})
+        for statement in statements:
+            self.__resolve_statement(statement)
+        self.scopes.pop()
+
+    def __resolve_statement(self, statement):
+        kind = statement.elem_type
+        if kind == InterpreterBase.VAR_DEF_NODE:
+            block = self.scopes[-1]
+            name = statement.name
+            if name in block:
+                statement.addr = None
+            else:
+                block[name] = len(block)
+                statement.addr = (len(self.scopes) - 1, block[name])
+        elif kind == "=":
+            self.__resolve_expr(statement.expression)
+            statement.addr = self.__lookup(statement.name)
+        elif kind == InterpreterBase.RETURN_NODE:
+            if statement.expression is not None:
+                self.__resolve_expr(statement.expression)
+        elif kind == InterpreterBase.RAISE_NODE:
+            self.__resolve_expr(statement.exception_type)
+        elif kind == InterpreterBase.IF_NODE:
+            self.__resolve_expr(statement.condition)
+            self.__resolve_block(statement.statements)
+            if statement.else_statements is not None:
+                self.__resolve_block(statement.else_statements)
+        elif kind == InterpreterBase.FOR_NODE:
+            self.__resolve_statement(statement.init)
+            self.__resolve_expr(statement.condition)
+            self.__resolve_statement(statement.update)
+            self.__resolve_block(statement.statements)
+        elif kind == InterpreterBase.TRY_NODE:
+            self.__resolve_block(statement.statements)
+            for catcher in statement.catchers:
+                self.__resolve_block(catcher.statements)
+        else:
+            self.__resolve_expr(statement)
+
+    # returns the set of addresses the expression reads
+    def __resolve_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        addrs = set()
+        if kind == InterpreterBase.VAR_NODE:
+            expr_ast.addr = self.__lookup(expr_ast.name)
+            if expr_ast.addr is not None:
+                addrs.add(expr_ast.addr)
+        elif kind == InterpreterBase.FCALL_NODE:
+            for arg in expr_ast.args:
+                addrs |= self.__resolve_expr(arg)
+        else:
+            for operand in ("op1", "op2"):
+                if expr_ast.get(operand) is not None:
+                    addrs |= self.__resolve_expr(expr_ast.get(operand))
+        expr_ast.free = Resolver.__group(addrs)
+        return addrs
+
+    @staticmethod
+    def __group(addrs):
+        blocks = {}
+        for depth, slot in sorted(addrs):
+            blocks.setdefault(depth, []).append(slot)
+        size = max(blocks) + 1 if blocks else 0
+        return (size, tuple((depth, tuple(slots)) for depth, slots in blocks.items()))
+
+    def __lookup(self, name):
+        for depth in range(len(self.scopes) - 1, -1, -1):
+            if name in self.scopes[depth]:
+                return (depth, self.scopes[depth][name])
+        return None
+
+
+# build the parameter block of a call from the (already copied) argument values
+def bind_params(param_slots, values):
+    if param_slots is None:
+        return values
+    block = [None] * (max(param_slots) + 1)
+    for slot, value in zip(param_slots, values):
+        block[slot] = value
+    return block
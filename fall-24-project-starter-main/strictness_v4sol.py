@@ -0,0 +1,185 @@
+from intbase import InterpreterBase
+from type_valuev4sol import NIL_VALUE, Type, Value, bool_value, int_value
+
+# Static pass run after resolver_v4sol, used to avoid creating LazyValues that cannot change the
+# behavior of a program.  It adds two annotations:
+#  - every expression node gets `pure`: True when it contains no function call, so evaluating
+#    it has no side effects (it may still raise or force lazy values).  A pure expression in a
+#    lazy position is handed to speculate() below, which evaluates it on the spot when that can
+#    neither raise nor force anything, e.g. `x + 1` when x is already evaluated.
+#  - every assignment gets `strict`: True when its value is certainly forced before any
+#    observable effect, because the next thing that runs forces the assigned variable first
+#    (`x = f(); print(x);`), and the variable belongs to the innermost block.  Such assignments
+#    are evaluated eagerly.  If the evaluation raises, the exception leaves the block that
+#    holds the variable either way, so nothing can tell it was raised one statement early.
+#    For the init and update of a for loop the forcing statement is the loop condition, and
+#    the loop propagates an exception raised by them.
+#  - every expression node gets `first`: the var node whose value evaluating it forces before
+#    anything else observable, or None.  The engines force that variable's lazy value (and the
+#    one it forces first, and so on) before the expression itself, deepest first, so a long
+#    chain of lazy values is forced by a loop rather than by one recursion per link.
+
+
+class StrictnessAnalyzer:
+    LITERAL_NODES = {
+        InterpreterBase.INT_NODE,
+        InterpreterBase.STRING_NODE,
+        InterpreterBase.BOOL_NODE,
+        InterpreterBase.NIL_NODE,
+    }
+    ARITH_OPS = {"+", "-", "*", "/", "==", "!=", ">", ">=", "<", "<="}
+    LOGICAL_OPS = {"&&", "||"}
+
+    def analyze_program(self, ast):
+        for func_def in ast.functions:
+            self.__analyze_block(func_def.statements, 1)
+        return ast
+
+    # depth is the block depth of the statements, as numbered by the resolver
+    def __analyze_block(self, statements, depth):
+        for statement in statements:
+            self.__analyze_statement(statement, depth)
+        # backwards, so that a strict assignment can make the one before it strict
+        for statement, next_statement in reversed(list(zip(statements, statements[1:]))):
+            if statement.elem_type == "=":
+                statement.strict = self.__forces_first(next_statement, statement, depth)
+
+    def __analyze_statement(self, statement, depth):
+        kind = statement.elem_type
+        if kind == "=":
+            self.__analyze_expr(statement.expression)
+            statement.strict = False
+        elif kind == InterpreterBase.RETURN_NODE:
+            if statement.expression is not None:
+                self.__analyze_expr(statement.expression)
+        elif kind == InterpreterBase.RAISE_NODE:
+            self.__analyze_expr(statement.exception_type)
+        elif kind == InterpreterBase.IF_NODE:
+            self.__analyze_expr(statement.condition)
+            self.__analyze_block(statement.statements, depth + 1)
+            if statement.else_statements is not None:
+                self.__analyze_block(statement.else_statements, depth + 1)
+        elif kind == InterpreterBase.FOR_NODE:
+            cond = statement.condition
+            self.__analyze_expr(cond)
+            for assign in (statement.init, statement.update):
+                self.__analyze_statement(assign, depth)
+                assign.strict = self.__is_target(self.__first_forced(cond), assign, depth)
+            self.__analyze_block(statement.statements, depth + 1)
+        elif kind == InterpreterBase.TRY_NODE:
+            self.__analyze_block(statement.statements, depth + 1)
+            for catcher in statement.catchers:
+                self.__analyze_block(catcher.statements, depth + 1)
+        elif kind != InterpreterBase.VAR_DEF_NODE:
+            self.__analyze_expr(statement)
+
+    def __analyze_expr(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind in StrictnessAnalyzer.LITERAL_NODES or kind == InterpreterBase.VAR_NODE:
+            expr_ast.pure = True
+        elif kind == InterpreterBase.FCALL_NODE:
+            for arg in expr_ast.args:
+                self.__analyze_expr(arg)
+            expr_ast.pure = False
+        elif kind in StrictnessAnalyzer.ARITH_OPS or kind in StrictnessAnalyzer.LOGICAL_OPS:
+            pure_op1 = self.__analyze_expr(expr_ast.op1)
+            pure_op2 = self.__analyze_expr(expr_ast.op2)
+            expr_ast.pure = pure_op1 and pure_op2
+        elif kind == InterpreterBase.NEG_NODE or kind == InterpreterBase.NOT_NODE:
+            expr_ast.pure = self.__analyze_expr(expr_ast.op1)
+        else:
+            expr_ast.pure = False
+        expr_ast.first = self.__first_forced(expr_ast)
+        return expr_ast.pure
+
+    # does running statement force the variable assigned by assign before anything else?
+    def __forces_first(self, statement, assign, depth):
+        kind = statement.elem_type
+        first = None
+        if kind == InterpreterBase.FCALL_NODE:
+            name = statement.name
+            args = statement.args
+            if name == "print":
+                first = self.__first_forced_of(args)
+            elif (name == "inputi" or name == "inputs") and len(args) == 1:
+                first = self.__first_forced(args[0])
+        elif kind == InterpreterBase.IF_NODE:
+            first = self.__first_forced(statement.condition)
+        elif kind == InterpreterBase.RAISE_NODE:
+            first = self.__first_forced(statement.exception_type)
+        elif kind == "=" and statement.strict:
+            first = self.__first_forced(statement.expression)
+        return self.__is_target(first, assign, depth)
+
+    def __is_target(self, var_ast, assign, depth):
+        return (
+            var_ast is not None
+            and assign.addr is not None
+            and var_ast.addr == assign.addr
+            and assign.addr[0] == depth
+        )
+
+    # the var node whose value an eager evaluation of expr_ast forces before doing anything
+    # else observable, or None
+    def __first_forced(self, expr_ast):
+        kind = expr_ast.elem_type
+        if kind == InterpreterBase.VAR_NODE:
+            return expr_ast
+        if kind in StrictnessAnalyzer.ARITH_OPS:
+            return self.__first_forced_of([expr_ast.op1, expr_ast.op2])
+        if kind in StrictnessAnalyzer.LOGICAL_OPS:
+            return self.__first_forced(expr_ast.op1)
+        if kind == InterpreterBase.NEG_NODE or kind == InterpreterBase.NOT_NODE:
+            return self.__first_forced(expr_ast.op1)
+        return None
+
+    # operands evaluated left to right; literals have no effect and are skipped
+    def __first_forced_of(self, exprs):
+        for expr_ast in exprs:
+            if expr_ast.elem_type not in StrictnessAnalyzer.LITERAL_NODES:
+                return self.__first_forced(expr_ast)
+        return None
+
+
+# evaluate a pure expression now if that can neither raise nor force a lazy value, following
+# the same rules as Interpreter.__eval_expr; returns None when the expression has to stay lazy
+def speculate(expr_ast, env, op_to_lambda):
+    kind = expr_ast.elem_type
+    if kind == InterpreterBase.VAR_NODE:
+        if expr_ast.addr is None:
+            return None
+        val = env.get(*expr_ast.addr)
+        return val if val.evaluated() else None
+    if kind == InterpreterBase.INT_NODE:
+        return int_value(expr_ast.val)
+    if kind == InterpreterBase.STRING_NODE:
+        return Value(Type.STRING, expr_ast.val)
+    if kind == InterpreterBase.BOOL_NODE:
+        return bool_value(expr_ast.val)
+    if kind == InterpreterBase.NIL_NODE:
+        return NIL_VALUE
+
+    left = speculate(expr_ast.op1, env, op_to_lambda)
+    if left is None:
+        return None
+    if kind == InterpreterBase.NEG_NODE:
+        return int_value(-1 * left.value()) if left.type() == Type.INT else None
+    if kind == InterpreterBase.NOT_NODE:
+        return bool_value(not left.value()) if left.type() == Type.BOOL else None
+    if kind in StrictnessAnalyzer.LOGICAL_OPS:
+        if left.type() != Type.BOOL:
+            return None
+        if (kind == "||") == bool(left.value()):
+            return bool_value(kind == "||")
+        right = speculate(expr_ast.op2, env, op_to_lambda)
+        return right if right is not None and right.type() == Type.BOOL else None
+
+    right = speculate(expr_ast.op2, env, op_to_lambda)
+    if right is None:
+        return None
+    if kind != "==" and kind != "!=" and left.type() != right.type():
+        return None
+    f = op_to_lambda[left.type()].get(kind)
+    if f is None or (kind == "/" and right.value() == 0):
+        return None
+    return f(left, right)
@@ -0,0 +1,324 @@
+import os
+
+import pytest
+
+import brewbin
+import brewcache
+from brewast import Node
+from brewparse import parse_program
+from element import Element
+from intbase import ErrorType
+from interpreterv4sol import Interpreter
+
+# Runs the same Brewin programs through every execution engine of interpreterv4sol and checks
+# they all print the same lines and end with the same error, plus round trips of the brewbin
+# format and the AST cache, and the step and time limits.  Run with `python -m pytest` from
+# this directory.
+
+# (name, interpreter keyword arguments); memoization only exists on the tree engine
+CONFIGS = [
+    ("tree", {"engine": "tree"}),
+    ("tree_memo", {"engine": "tree", "memo_size": 64}),
+    ("tree_raise", {"engine": "tree_raise"}),
+    ("closure", {"engine": "closure"}),
+    ("bytecode", {"engine": "bytecode"}),
+]
+
+# name -> (source, expected output, expected error type or None)
+PROGRAMS = {
+    "lazy_order": (
+        """
+func foo() { print("foo"); return 5; }
+func main() { var x; x = foo(); print("before"); print(x); print(x); }
+""",
+        ["before", "foo", "5", "5"],
+        None,
+    ),
+    "lazy_chain": (
+        """
+func main() {
+  var a; var b; var c; var i;
+  a = 1;
+  for (i = 0; i < 2000; i = i + 1) { b = a + 1; a = b; }
+  c = a;
+  print(c);
+}
+""",
+        ["2001"],
+        None,
+    ),
+    "lazy_alias": (
+        """
+func p(s) { print("p ", s); return s; }
+func id(x) { return x; }
+func main() {
+  var a; var b; var c;
+  a = p(1);
+  b = a;
+  c = id(b);
+  print(c, b, a);
+}
+""",
+        ["p 1", "111"],
+        None,
+    ),
+    "try_raise": (
+        """
+func thrower(s) { raise s; }
+func f(n) {
+  try { if (n > 2) { thrower("big"); } print("small ", n); }
+  catch "big" { print("caught big ", n); raise "again"; }
+  catch "other" { print("no"); }
+  return n;
+}
+func main() {
+  var i;
+  for (i = 0; i < 5; i = i + 1) {
+    try { f(i); } catch "again" { print("outer ", i); }
+  }
+  try { try { raise "x"; } catch "y" { print("bad"); } } catch "x" { print("x ok"); }
+}
+""",
+        ["small 0", "small 1", "small 2", "caught big 3", "outer 3", "caught big 4", "outer 4",
+         "x ok"],
+        None,
+    ),
+    "div0": (
+        """
+func main() {
+  var x; x = 0;
+  try { x = 1 / 0; print(x); } catch "div0" { print("c"); }
+  try { raise 1 / 0; } catch "div0" { print("div0 raised"); }
+  var y; y = 10 / x;
+  print("lazy, not forced");
+  print(y);
+}
+""",
+        ["c", "div0 raised", "lazy, not forced"],
+        ErrorType.FAULT_ERROR,
+    ),
+    "lazy_raise": (
+        """
+func bad() { raise "b"; }
+func main() {
+  var x; x = bad(); print("assigned");
+  try { print(x); } catch "b" { print("caught b"); }
+  try { print(x); } catch "b" { print("caught b again"); }
+}
+""",
+        ["assigned", "caught b", "caught b again"],
+        None,
+    ),
+    "shadowing": (
+        """
+func shadow(x) { var x; x = "inner"; print(x); return x; }
+func main() {
+  print(shadow(5));
+  var x; x = 1;
+  if (true) { print(x); var x; x = 2; print(x); if (true) { x = 3; var y; y = x; print(y); } print(x); }
+  print(x);
+  var t; t = x + 100;
+  x = 50;
+  if (true) { var x; x = 7; print(t); }
+}
+""",
+        ["inner", "inner", "1", "2", "3", "3", "1", "101"],
+        None,
+    ),
+    "block_scope_error": (
+        """
+func main() {
+  var i;
+  for (i = 0; i < 3; i = i + 1) { var j; j = i; if (i > 0) { print(j, k); } var k; k = i * 10; }
+}
+""",
+        [],
+        ErrorType.NAME_ERROR,
+    ),
+    "overload_and_recursion": (
+        """
+func fib(n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+func fib(n, m) { return fib(n) + fib(m); }
+func count(n) { if (n == 0) { return 0; } return 1 + count(n - 1); }
+func main() { print(fib(15)); print(fib(10, 5)); print(count(150)); }
+""",
+        ["610", "60", "150"],
+        None,
+    ),
+    "folding": (
+        """
+func f() { return 1; print("dead"); }
+func main() {
+  var x;
+  x = 2 * 3 + 4;
+  if (true || x > 1) { print(x); } else { print("no"); }
+  for (x = 0; false; x = x + 1) { print(x); }
+  print(-5, !false, f(), "a" + "b");
+}
+""",
+        ["10", "-5true1ab"],
+        None,
+    ),
+    "type_error": (
+        """
+func main() { print("a"); print(1 + "b"); }
+""",
+        ["a"],
+        ErrorType.TYPE_ERROR,
+    ),
+    "uncaught": (
+        """
+func main() { print("start"); raise "oops"; print("never"); }
+""",
+        ["start"],
+        ErrorType.FAULT_ERROR,
+    ),
+}
+
+
+def run(src, inp=None, **kwargs):
+    interp = Interpreter(console_output=False, inp=inp, **kwargs)
+    try:
+        interp.run(src)
+    except Exception:
+        pass  # the error type is checked through get_error_type_and_line
+    error_type, _ = interp.get_error_type_and_line()
+    return list(interp.get_output()), error_type
+
+
+@pytest.mark.parametrize("config", [kwargs for _, kwargs in CONFIGS], ids=[n for n, _ in CONFIGS])
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_engines_agree(name, config):
+    src, expected_output, expected_error = PROGRAMS[name]
+    assert run(src, **config) == (expected_output, expected_error)
+
+
+@pytest.mark.parametrize("config", [kwargs for _, kwargs in CONFIGS], ids=[n for n, _ in CONFIGS])
+def test_input(config):
+    src = 'func main() { var a; a = inputi("n? "); print(a + 1, inputs()); }'
+    assert run(src, inp=["41", "x"], **config) == (["n? ", "42x"], None)
+
+
+# print converts each argument as it is evaluated, so a nil argument fails before the calls
+# after it run, on every engine
+@pytest.mark.parametrize("config", [kwargs for _, kwargs in CONFIGS], ids=[n for n, _ in CONFIGS])
+def test_print_argument_order(config):
+    src = 'func f() { print("side effect"); return 1; } func main() { print(nil, f()); }'
+    interp = Interpreter(console_output=False, **config)
+    with pytest.raises(TypeError):
+        interp.run(src)
+    assert interp.get_output() == []
+
+
+# the bytecode VM keeps calls on a frame stack of its own, so recursion far deeper than
+# Python's recursion limit works without raising it
+def test_bytecode_deep_recursion():
+    src = """
+func count(n) { if (n == 0) { return 0; } return 1 + count(n - 1); }
+func main() { print(count(20000)); }
+"""
+    assert run(src, engine="bytecode") == (["20000"], None)
+
+
+def test_bytecode_max_depth():
+    src = """
+func count(n) { if (n == 0) { return 0; } return 1 + count(n - 1); }
+func main() { print(count(5000)); }
+"""
+    assert run(src, engine="bytecode", max_depth=1000) == ([], ErrorType.FAULT_ERROR)
+
+
+def test_fold_stats():
+    interp = Interpreter(console_output=False)
+    interp.run(PROGRAMS["folding"][0])
+    assert interp.fold_stats == {"folded": 6, "pruned": 3, "removed": interp.fold_stats["removed"]}
+    assert interp.fold_stats["removed"] > 0
+
+
+LOOP = "func main() { var i; for (i = 0; true; i = i + 1) { i = i; } }"
+
+
+@pytest.mark.parametrize("config", [kwargs for _, kwargs in CONFIGS], ids=[n for n, _ in CONFIGS])
+def test_step_limit(config):
+    interp = Interpreter(console_output=False, max_steps=5000, **config)
+    with pytest.raises(Exception):
+        interp.run(LOOP)
+    assert interp.get_error_type_and_line()[0] == ErrorType.STEP_LIMIT_ERROR
+    assert interp.limits.used()["steps"] == 5001
+
+
+def test_step_limit_not_hit():
+    assert run(PROGRAMS["lazy_chain"][0], max_steps=10**6) == (["2001"], None)
+
+
+@pytest.mark.parametrize("config", [kwargs for _, kwargs in CONFIGS], ids=[n for n, _ in CONFIGS])
+def test_timeout(config):
+    interp = Interpreter(console_output=False, timeout=0.2, **config)
+    with pytest.raises(Exception):
+        interp.run(LOOP)
+    assert interp.get_error_type_and_line()[0] == ErrorType.TIMEOUT_ERROR
+
+
+def ast_lines(node, out):
+    if isinstance(node, list):
+        for item in node:
+            ast_lines(item, out)
+    elif isinstance(node, Node):
+        out.append((type(node).__name__, node.get("line")))
+        for _, value in node.items():
+            ast_lines(value, out)
+    return out
+
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_brewbin_round_trip(name):
+    ast = parse_program(PROGRAMS[name][0])
+    loaded = brewbin.loads(brewbin.dumps(ast))
+    assert str(loaded) == str(ast)
+    assert ast_lines(loaded, []) == ast_lines(ast, [])
+
+
+def test_brewbin_elements():
+    tree = Element("program", functions=[Element("func", name="main", args=[], n=-300, ok=True)])
+    loaded = brewbin.loads(brewbin.dumps(tree))
+    assert isinstance(loaded, Element)
+    assert str(loaded) == str(tree)
+
+
+def test_brewbin_bundle(tmp_path):
+    path = str(tmp_path / "programs.brb")
+    programs = {name: parse_program(PROGRAMS[name][0]) for name in ("div0", "shadowing")}
+    brewbin.dump_bundle(programs, path)
+    with brewbin.Bundle(path) as bundle:
+        assert bundle.names() == ["div0", "shadowing"]
+        assert str(bundle.get("shadowing")) == str(programs["shadowing"])
+
+
+def test_brewbin_rejects_bad_data():
+    data = brewbin.dumps(parse_program(PROGRAMS["div0"][0]))
+    with pytest.raises(brewbin.BrewbinError):
+        brewbin.loads(data[: len(data) // 2])
+    with pytest.raises(brewbin.BrewbinError):
+        brewbin.loads(b"XXXX" + data[4:])
+
+
+def test_ast_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(brewcache, "AST_CACHE_DIR", str(tmp_path))
+    src = PROGRAMS["try_raise"][0]
+    assert brewcache.load_ast(src) is None
+    ast = parse_program(src)
+    assert len(os.listdir(tmp_path)) == 1
+    cached = brewcache.load_ast(src)
+    assert str(cached) == str(ast)
+    assert ast_lines(cached, []) == ast_lines(ast, [])
+    assert run(src) == (PROGRAMS["try_raise"][1], None)  # runs from the cached AST
+
+
+def test_prebuilt_tables(tmp_path, monkeypatch):
+    brewcache.build_tables(str(tmp_path))
+    monkeypatch.setattr(brewcache, "TABLE_DIR", str(tmp_path))
+    assert brewcache.load_table(brewcache.PARSETAB) is not None
+    assert brewcache.load_table(brewcache.LEXTAB) is not None
+    with open(tmp_path / brewcache.SIGNATURE_FILE, "w") as f:
+        f.write("stale\n")
+    assert brewcache.load_table(brewcache.PARSETAB) is None
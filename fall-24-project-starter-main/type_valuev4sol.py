@@ -1,5 +1,22 @@
+from enum import Enum
+
 from intbase import InterpreterBase
 
+
+# status returned alongside every value by statements, expressions and calls
+class ExecStatus(Enum):
+    CONTINUE = 1
+    RETURN = 2
+    EXCEPTION = 3
+
+
+# a Brewin exception in flight, for the engines that unwind with Python exceptions instead of
+# returning ExecStatus.EXCEPTION (bytecode_v4sol.py, raising_v4sol.py); value is the raised Value
+class BrewinRaise(Exception):
+    def __init__(self, value):
+        self.value = value
+
+
 # Enumerated type for our different language data types
 class Type:
     INT = "int"
@@ -9,6 +26,8 @@ class Type:
 
 
 class ValueBase:
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -23,7 +42,12 @@ class ValueBase:
 
 
 # Represents a value, which has a type and its value
+# Values are never modified once built, so they can be shared: copying one (the interpreters
+# copy.copy arguments and return values) returns the value itself, and the results of
+# operations come from the canonical instances below where there is one.
 class Value(ValueBase):
+    __slots__ = ("t", "v")
+
     def __init__(self, type, value=None):
         self.t = type
         self.v = value
@@ -33,11 +57,17 @@ class Value(ValueBase):
 
     def type(self):
         return self.t
+
+    def __copy__(self):
+        return self
     
     def __str__(self) -> str:
         return f"Value({self.t}, {self.v})"
     
+# filled in when it is evaluated, so unlike Value it is copied for real
 class LazyValue(ValueBase):
+    __slots__ = ("ast_expr", "top_env", "eval", "v", "t")
+
     def __init__(self, ast_expr, top_env):
         self.ast_expr = ast_expr
         self.top_env = top_env
@@ -72,17 +102,46 @@ class LazyValue(ValueBase):
     
 
 
+TRUE_VALUE = Value(Type.BOOL, True)
+FALSE_VALUE = Value(Type.BOOL, False)
+NIL_VALUE = Value(Type.NIL, None)
+SMALL_INT_MIN = -128
+SMALL_INT_MAX = 1024
+SMALL_INTS = [Value(Type.INT, i) for i in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)]
+
+
+def int_value(n):
+    if SMALL_INT_MIN <= n <= SMALL_INT_MAX:
+        return SMALL_INTS[n - SMALL_INT_MIN]
+    return Value(Type.INT, n)
+
+
+def bool_value(b):
+    return TRUE_VALUE if b else FALSE_VALUE
+
+
+# the Value for a type and python value, shared where possible
+def make_value(t, v):
+    if t == Type.INT:
+        return int_value(v)
+    if t == Type.BOOL:
+        return bool_value(v)
+    if t == Type.NIL:
+        return NIL_VALUE
+    return Value(t, v)
+
+
 def create_value(val):
     if val == InterpreterBase.TRUE_DEF:
-        return Value(Type.BOOL, True)
+        return TRUE_VALUE
     elif val == InterpreterBase.FALSE_DEF:
-        return Value(Type.BOOL, False)
+        return FALSE_VALUE
     elif val == InterpreterBase.NIL_DEF:
-        return Value(Type.NIL, None)
+        return NIL_VALUE
     elif isinstance(val, str):
         return Value(Type.STRING, val)
     elif isinstance(val, int):
-        return Value(Type.INT, val)
+        return int_value(val)
     else:
         raise ValueError("Unknown value type")
 